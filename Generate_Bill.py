@@ -1,59 +1,308 @@
 from reportlab.lib.pagesizes import A4
 from reportlab.platypus import (
-    SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak
+    SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak, Frame, Flowable
 )
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib import colors
-import os, tempfile
+from reportlab.lib.utils import ImageReader
+from reportlab.lib.boxstuff import aspectRatioFix
+from reportlab.pdfbase import pdfdoc
+from reportlab.pdfgen.canvas import _digester
+import os, copy, itertools, logging, tempfile, threading
+from io import BytesIO
+import metrics
+from booking import Booking
+from pricing import compute_totals, day_charges
 from datetime import datetime, timedelta, timezone
 from reportlab.lib.units import mm
 
+log = logging.getLogger(__name__)
+
 # ---------- TIMEZONE FIX (IST manual offset) ----------
 IST = timezone(timedelta(hours=5, minutes=30))
 
-def _f(v):
-    try:
-        return float(v)
-    except:
-        return 0.0
+PAGE_MARGINS = dict(leftMargin=40, rightMargin=40, topMargin=170, bottomMargin=100)
+
+# Compact bills (for sending over WhatsApp) embed the logo downsampled to this
+# resolution at its printed size, flattened onto the white header.
+LOGO_PRINT_DPI = int(os.environ.get("BILL_LOGO_DPI", 200))
+LOGO_HEIGHT = 45
+LOGO_WIDTH = LOGO_HEIGHT * 2.5
+
+# printed at the top right of page 1 for bookings saved in the booking store
+BILL_NO_FORMAT = "Bill No: {:06d}"
+
+# Lay page 2 out once per variant and reuse it (BILL_PAGE2_CACHE=0 disables).
+USE_PAGE2_CACHE = os.environ.get("BILL_PAGE2_CACHE", "1") != "0"
+
+TERMS_TITLE = "Important Terms & Conditions:"
+
+TERMS = {
+    "confirmed": [
+        "1. Event date once booked cannot be changed; advance amount is non-refundable.",
+        "2. Management is not responsible for loss or damage to guests’ personal belongings.",
+        "3. The function hall will be handed over 4 hours before the scheduled event time.",
+        "4. The customer named in the invoice will be held responsible for any damage or missing items belonging to the function hall.",
+        "5. Power-backup charges (2,500 rupees per hour) apply only if the generator is used.",
+        "6. Balance must be paid as soon as the event concludes.",
+        "7. Electricity meter reading starts when the hall is given to the decoration team.",
+        "8. Live cooking counter is not allowed inside the hall.",
+    ],
+    "quotation": [
+        "1. This quote is valid for only 7 days from the inquiry date. Your booking will be confirmed once we receive the advance payment.",
+        "2. Event date once booked cannot be changed; advance amount is non-refundable.",
+        "3. Management is not responsible for loss or damage to guests’ personal belongings.",
+        "4. The function hall will be handed over 4 hours before the scheduled event time.",
+        "5. The customer named in the invoice will be held responsible for any damage or missing items belonging to the function hall.",
+        "6. Power-backup charges (2,500 rupees per hour) apply only if the generator is used.",
+        "7. Balance must be paid as soon as the event concludes.",
+        "8. Electricity meter reading starts when the hall is given to the decoration team.",
+        "9. Live cooking counter is not allowed inside the hall.",
+    ],
+}
+
+FOOTER_TEXT = (
+    "AA Residency A/C | Contact: 8790057559 | "
+    "22-11-246/1, Gollavani Gunta, Renigunta Rd, AutoNagar, "
+    "Tirupati, Andhra Pradesh 517501"
+)
 
 def _fmt(v):
-    try:
-        return f"{float(v):.2f}"
-    except:
-        return str(v or "")
+    return "" if v is None else f"{v:.2f}"
+
+def _count(v):
+    return "" if v is None else str(v)
 
 def _logo_path():
     return os.path.join(os.path.dirname(__file__), "static", "logo.png")
 
 
+# RENDER RESOURCES (built once per process) -------------------------------------------------------
+GUEST_TABLE_STYLE = [
+    ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#e9f0ff")),
+    ("TEXTCOLOR", (0, 0), (-1, 0), colors.HexColor("#0b5ed7")),
+    ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+    ("ALIGN", (0, 0), (-1, 0), "LEFT"),
+    ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
+    ("FONTNAME", (0, 1), (0, -1), "Helvetica-Bold"),
+    ("ALIGN", (0, 1), (1, -1), "LEFT"),
+    ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+]
+
+ROOM_TABLE_STYLE = [
+    ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#e9f0ff")),
+    ("TEXTCOLOR", (0, 0), (-1, 0), colors.HexColor("#0b5ed7")),
+    ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+    ("ALIGN", (0, 0), (-1, -1), "CENTER"),
+    ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
+    ("FONTSIZE", (0, 0), (-1, -1), 9),
+]
+
+PAY_TABLE_STYLE = [
+    ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#f2f6ff")),
+    ("TEXTCOLOR", (0, 0), (-1, 0), colors.HexColor("#0b5ed7")),
+    ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+    ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
+    ("ALIGN", (0, 1), (-1, -1), "LEFT"),
+]
+
+
+class BillResources:
+    """
+    Styles, table styles and the decoded logo shared by every render.
+
+    Render calls only read from an instance; nothing on it is mutated after
+    __init__, so one instance can be used from many threads at once.
+    """
+
+    def __init__(self, logo_path, logo_mtime):
+        styles = getSampleStyleSheet()
+        normal = styles["Normal"]
+        normal.fontSize = 10
+        normal.leading = 14
+
+        self.styles = styles
+        self.normal = normal
+        self.header_style = ParagraphStyle(
+            "SectionHeader",
+            parent=normal,
+            fontName="Helvetica-Bold",
+            fontSize=12,
+            spaceAfter=4,
+            spaceBefore=8,
+        )
+
+        self.guest_table_style = TableStyle(GUEST_TABLE_STYLE)
+        self.room_table_style = TableStyle(ROOM_TABLE_STYLE)
+
+        # one payment style per possible "Balance" row position
+        self._pay_table_styles = {}
+        for idx in range(1, 12):
+            self._pay_table_styles[idx] = TableStyle(PAY_TABLE_STYLE + [
+                ("FONTNAME", (0, idx), (-1, idx), "Helvetica-Bold"),
+                ("FONTSIZE", (0, idx), (-1, idx), 11),
+            ])
+        self._pay_table_style_plain = TableStyle(PAY_TABLE_STYLE)
+
+        self.logo_path = logo_path
+        self.logo_mtime = logo_mtime
+        self.logo = None
+        self.logo_image = None
+        self.compact_logo = None
+        if logo_mtime is not None:
+            try:
+                self.logo = ImageReader(logo_path)
+            except (OSError, ValueError) as e:
+                log.warning("Bills will have no logo, %s could not be read: %r", logo_path, e)
+        if self.logo is not None:
+            # EmbeddedImage relies on ReportLab internals; without it the logo is drawn with drawImage
+            try:
+                self.logo_image = EmbeddedImage(self.logo)
+                self.compact_logo = EmbeddedImage(ImageReader(_print_size_logo(logo_path)))
+            except (AttributeError, KeyError, TypeError, OSError, ValueError) as e:
+                log.warning("Logo will be re-encoded for every bill, it could not be shared: %r", e)
+
+    def pay_table_style(self, balance_row_idx):
+        if balance_row_idx is None:
+            return self._pay_table_style_plain
+        return self._pay_table_styles.get(balance_row_idx) or TableStyle(PAY_TABLE_STYLE + [
+            ("FONTNAME", (0, balance_row_idx), (-1, balance_row_idx), "Helvetica-Bold"),
+            ("FONTSIZE", (0, balance_row_idx), (-1, balance_row_idx), 11),
+        ])
+
+
+class EmbeddedImage:
+    """
+    An image XObject encoded once and shared by every PDF that draws it.
+
+    canvas.drawImage hashes and zlib-compresses the pixels again for each new
+    document; here that happens once and each document gets a shallow copy
+    of the finished stream. The XObject name is the one drawImage would use
+    (mask="auto"), so the output is the same bytes.
+    """
+
+    def __init__(self, reader):
+        rgb = reader.getRGBData()   # also splits off the alpha channel into _dataA
+        alpha = reader._dataA
+        self.name = _digester(rgb + (alpha.getRGBData() if alpha else b"auto"))
+        self.xobject = pdfdoc.PDFImageXObject(self.name, reader, mask="auto")
+        self.xobject.name = self.name
+        self.smask = self.xobject.__dict__.pop("_smask", None)
+        self.width = self.xobject.width
+        self.height = self.xobject.height
+
+    def draw(self, canvas, x, y, width, height):
+        """Like canvas.drawImage(..., preserveAspectRatio=True, mask="auto")."""
+        canvas._currentPageHasImages = 1
+        doc = canvas._doc
+        reg_name = doc.getXObjectName(self.name)
+        if doc.idToObject.get(reg_name) is None:
+            img = copy.copy(self.xobject)
+            canvas._setXObjects(img)
+            doc.Reference(img, reg_name)
+            doc.addForm(self.name, img)
+            if self.smask is not None:
+                mask_name = doc.getXObjectName(self.smask.name)
+                if doc.idToObject.get(mask_name) is None:
+                    smask = copy.copy(self.smask)
+                    canvas._setXObjects(smask)
+                    img.smask = doc.Reference(smask, mask_name)
+                else:
+                    img.smask = pdfdoc.PDFObjectReference(mask_name)
+
+        x, y, width, height, _ = aspectRatioFix(True, "c", x, y, width, height, self.width, self.height, False)
+        canvas.saveState()
+        canvas.translate(x, y)
+        canvas.scale(width, height)
+        canvas._code.append("/%s Do" % reg_name)
+        canvas.restoreState()
+        canvas._formsinuse.append(self.name)
+
+
+def _print_size_logo(path):
+    """The logo resampled to LOGO_PRINT_DPI at the size it is drawn, on white."""
+    from PIL import Image
+
+    with Image.open(path) as im:
+        im = im.convert("RGBA")
+        scale = min(LOGO_WIDTH / im.width, LOGO_HEIGHT / im.height)
+        size = (
+            max(1, round(im.width * scale / 72 * LOGO_PRINT_DPI)),
+            max(1, round(im.height * scale / 72 * LOGO_PRINT_DPI)),
+        )
+        if size[0] < im.width:
+            im = im.resize(size, Image.LANCZOS)
+        flat = Image.new("RGB", im.size, (255, 255, 255))
+        flat.paste(im, mask=im.getchannel("A"))
+        return flat
+
+
+_resources = None
+_resources_lock = threading.Lock()
+
+
+def _logo_mtime(path):
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
+
+
+def get_resources():
+    """Return the process-wide BillResources, rebuilding it if the logo changed."""
+    global _resources
+
+    logo = _logo_path()
+    mtime = _logo_mtime(logo)
+    res = _resources
+    if res is not None and res.logo_mtime == mtime:
+        return res
+
+    with _resources_lock:
+        res = _resources
+        if res is None or res.logo_mtime != mtime:
+            res = BillResources(logo, mtime)
+            _resources = res
+    return res
+
+
 # HEADER FOR PAGE 1 --------------------------------------------------------------------------------
-def draw_header_page1(canvas, doc, title_text):
+def draw_header_page1(canvas, doc, title_text, resources=None, compact=False, bill_no=None):
     w, h = A4
     canvas.setFillColor(colors.white)
     canvas.rect(0, h - 130, w, 130, stroke=0, fill=1)
 
-    logo = _logo_path()
-    if os.path.exists(logo):
+    res = resources or get_resources()
+    logo = res.compact_logo if compact else res.logo_image
+    drawn = False
+    if logo is not None:
+        try:
+            logo.draw(canvas, (w - LOGO_WIDTH) / 2, h - 120, LOGO_WIDTH, LOGO_HEIGHT)
+            drawn = True
+        except (AttributeError, KeyError, TypeError) as e:
+            log.warning("Shared logo could not be drawn, falling back to drawImage: %r", e)
+    if not drawn and res.logo is not None:
         try:
-            logo_h = 45
-            logo_w = logo_h * 2.5
             canvas.drawImage(
-                logo,
-                (w - logo_w) / 2,
+                res.logo,
+                (w - LOGO_WIDTH) / 2,
                 h - 120,
-                width=logo_w,
-                height=logo_h,
+                width=LOGO_WIDTH,
+                height=LOGO_HEIGHT,
                 preserveAspectRatio=True,
                 mask="auto",
             )
-        except:
-            pass
+        except (OSError, ValueError) as e:
+            log.warning("Bill drawn without its logo: %r", e)
 
     canvas.setFont("Helvetica-Bold", 16)
     canvas.setFillColor(colors.black)
     canvas.drawCentredString(w / 2, h - 140, title_text)
 
+    if bill_no is not None:
+        canvas.setFont("Helvetica-Bold", 10)
+        canvas.drawRightString(w - PAGE_MARGINS["rightMargin"], h - 40, BILL_NO_FORMAT.format(bill_no))
+
     canvas.setFont("Helvetica-Oblique", 9)
     canvas.setFillColor(colors.grey)
     canvas.drawCentredString(w / 2, 30, "Thank you for booking with us!")
@@ -71,49 +320,124 @@ def draw_footer_and_signatures_page2(canvas, doc):
     canvas.line(w - 240, y, w - 60, y)
     canvas.drawCentredString(w - 150, y - 14, "Hotel Management Signature")
 
-    footer = (
-        "AA Residency A/C | Contact: 8790057559 | "
-        "22-11-246/1, Gollavani Gunta, Renigunta Rd, AutoNagar, "
-        "Tirupati, Andhra Pradesh 517501"
-    )
     canvas.setFont("Helvetica", 9)
-    canvas.drawCentredString(w / 2, 35, footer)
+    canvas.drawCentredString(w / 2, 35, FOOTER_TEXT)
 
 
-# MAIN GENERATOR -----------------------------------------------------------------------------------
-def generate_bill(data):
+# PRE-LAID-OUT PAGE 2 ------------------------------------------------------------------------------
+def _page2_flowables(variant, res):
+    story = [Paragraph(TERMS_TITLE, res.header_style)]
+    for t in TERMS[variant]:
+        story.append(Paragraph(t, res.normal))
+    return story
 
-    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".pdf")
-    filepath = tmp.name
-    tmp.close()
 
-    doc = SimpleDocTemplate(
-        filepath,
-        pagesize=A4,
-        leftMargin=40,
-        rightMargin=40,
-        topMargin=170,
-        bottomMargin=100,
-    )
+class _Placement(Flowable):
+    """Stands in for a flowable during the one-off layout pass and records where it lands."""
 
-    styles = getSampleStyleSheet()
-    normal = styles["Normal"]
-    normal.fontSize = 10
-    normal.leading = 14
-
-    header_style = ParagraphStyle(
-        "SectionHeader",
-        parent=normal,
-        fontName="Helvetica-Bold",
-        fontSize=12,
-        spaceAfter=4,
-        spaceBefore=8,
-    )
+    def __init__(self, flowable, placed):
+        Flowable.__init__(self)
+        self.flowable = flowable
+        self.placed = placed
 
-    story = []
+    def wrap(self, availWidth, availHeight):
+        return self.flowable.wrap(availWidth, availHeight)
 
-    advance_amt = _f(data.get("advance"))
-    advance_mode = data.get("advance_mode") or ""
+    def getSpaceBefore(self):
+        return self.flowable.getSpaceBefore()
+
+    def getSpaceAfter(self):
+        return self.flowable.getSpaceAfter()
+
+    def drawOn(self, canvas, x, y, _sW=0):
+        self.placed.append((self.flowable, self.flowable._hAlignAdjust(x, _sW), y))
+
+
+class CachedPage(Flowable):
+    """
+    A page of flowables wrapped and positioned once, then replayed onto any
+    number of documents. Only drawing happens per bill; no measuring or
+    line-breaking.
+    """
+
+    def __init__(self, placed):
+        Flowable.__init__(self)
+        self.placed = placed
+
+    def wrap(self, availWidth, availHeight):
+        return (availWidth, 0)
+
+    def drawOn(self, canvas, x, y, _sW=0):
+        for flowable, fx, fy in self.placed:
+            # shallow copy: drawOn sets .canv on the flowable, the wrapped lines are shared
+            copy.copy(flowable).drawOn(canvas, fx, fy)
+
+
+def layout_page(flowables):
+    """Lay `flowables` out in the body frame of a bill page and return a CachedPage."""
+    w, h = A4
+    m = PAGE_MARGINS
+    frame = Frame(
+        m["leftMargin"],
+        m["bottomMargin"],
+        w - m["leftMargin"] - m["rightMargin"],
+        h - m["topMargin"] - m["bottomMargin"],
+    )
+    placed = []
+    for f in flowables:
+        if not frame.add(_Placement(f, placed), None):
+            raise ValueError("cached page content does not fit on one page")
+    return CachedPage(placed)
+
+
+_page2_cache = {}
+_page2_lock = threading.Lock()
+
+
+def get_page2(variant, res=None):
+    """Return the cached page 2 for `variant`, laying it out again if the terms or styles changed."""
+    res = res or get_resources()
+    key = (variant, TERMS_TITLE, tuple(TERMS[variant]), id(res))
+    page = _page2_cache.get(key)
+    if page is None:
+        with _page2_lock:
+            page = _page2_cache.get(key)
+            if page is None:
+                page = layout_page(_page2_flowables(variant, res))
+                for k in [k for k in _page2_cache if k[0] == variant]:
+                    del _page2_cache[k]
+                _page2_cache[key] = page
+    return page
+
+
+def warm_page2_cache():
+    for variant in TERMS:
+        get_page2(variant)
+
+
+def booking_time(booking):
+    """The booking's own timestamp, else the current IST time."""
+    booked_at = booking.booked_at
+    if booked_at is None:
+        return datetime.now(IST)
+    if booked_at.tzinfo is None:
+        return booked_at.replace(tzinfo=IST)
+    return booked_at.astimezone(IST)
+
+
+# BILL CONTENT -------------------------------------------------------------------------------------
+GUEST_COL_WIDTHS = (0.30, 0.70)
+ROOM_COL_WIDTHS = (0.25, 0.18, 0.18, 0.19, 0.20)
+PAY_COL_WIDTHS = (0.65, 0.35)
+
+
+def bill_content(booking):
+    """
+    Work out everything printed on the bill: title, timestamp and table rows.
+    Both rendering engines draw from this dict, so they always agree on text.
+    """
+    advance_amt = booking.advance
+    advance_mode = booking.advance_mode
 
     title_text = (
         "Function Hall Booking Details"
@@ -121,8 +445,9 @@ def generate_bill(data):
         else "Function Hall Booking Quotation"
     )
 
-    # ----------- CURRENT TIMESTAMP IN IST -------------
-    now_kolkata = datetime.now(IST)
+    # ----------- BOOKING TIMESTAMP IN IST -------------
+    # "booked_at" pins the line to the booking so re-renders are identical
+    now_kolkata = booking_time(booking)
     now = now_kolkata.strftime("%d-%m-%Y Time %H:%M")
 
     timestamp = (
@@ -131,232 +456,253 @@ def generate_bill(data):
         else f"Booking inquiry made on: {now}"
     )
 
-    story.append(
-        Paragraph(
-            f'<para alignment="right"><font size=9>{timestamp}</font></para>',
-            normal,
-        )
-    )
-    story.append(Spacer(1, 4))
-
     # ---------------- Guest Details ------------------------------------------------------
-
-    def fmt_check_dt(raw):
-        if not raw:
-            return ""
-        try:
-            dt = datetime.strptime(raw, "%Y-%m-%dT%H:%M")
-            dt = dt.replace(tzinfo=IST)
-            return dt.strftime("%d-%m-%Y Time %H:%M")
-        except:
-            return raw
-
-    story.append(Paragraph("Guest Details:", header_style))
-
-    guest_table_data = [
+    guest_rows = [
         ["Field", "Details"],
-        ["Name", data.get("name") or ""],
-        ["Pax", data.get("pax") or ""],
-        ["Mobile", data.get("mobile") or ""],
-        ["Event Type", data.get("event_type") or ""],
-        ["Function Check-in", fmt_check_dt(data.get("checkin"))],
-        ["Function Check-out", fmt_check_dt(data.get("checkout"))],
+        ["Name", booking.name],
+        ["Pax", _count(booking.pax)],
+        ["Mobile", booking.mobile],
+        ["Event Type", booking.event_type],
+        ["Function Check-in", booking.checkin.strftime("%d-%m-%Y Time %H:%M")],
+        ["Function Check-out", booking.checkout.strftime("%d-%m-%Y Time %H:%M")],
     ]
 
-    guest_tbl = Table(
-        guest_table_data,
-        colWidths=[doc.width * 0.30, doc.width * 0.70],
-    )
-
-    guest_tbl.setStyle(
-        TableStyle(
-            [
-                ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#e9f0ff")),
-                ("TEXTCOLOR", (0, 0), (-1, 0), colors.HexColor("#0b5ed7")),
-                ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
-                ("ALIGN", (0, 0), (-1, 0), "LEFT"),
-                ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
-                ("FONTNAME", (0, 1), (0, -1), "Helvetica-Bold"),
-                ("ALIGN", (0, 1), (1, -1), "LEFT"),
-                ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
-            ]
-        )
-    )
-
-    story.append(guest_tbl)
-    story.append(Spacer(1, 8))
-
     # ---------------- Room Details -------------------------------------------------------
-    room_needed = data.get("room_needed") == "on"
+    room_needed = booking.room_needed
 
+    room_rows = None
     if room_needed:
-        story.append(Paragraph("Room Details:", header_style))
-
-        room_data = [
+        room_rows = [
             ["Room Type", "No. of Rooms", "Extra Bed/Room", "AC/Non-AC", "Rent (Per Room)"],
             [
                 "Double",
-                data.get("double_rooms") or "",
-                data.get("double_extra") or "",
-                data.get("double_ac") or "",
-                _fmt(data.get("double_rent")),
+                _count(booking.double_rooms),
+                _count(booking.double_extra),
+                booking.double_ac,
+                _fmt(booking.double_rent),
             ],
             [
                 "Triple",
-                data.get("triple_rooms") or "",
-                data.get("triple_extra_bed") or "",
-                data.get("triple_ac") or "",
-                _fmt(data.get("triple_rent_per_room")),
+                _count(booking.triple_rooms),
+                _count(booking.triple_extra_bed),
+                booking.triple_ac,
+                _fmt(booking.triple_rent_per_room),
             ],
         ]
 
-        room_tbl = Table(
-            room_data,
-            colWidths=[
-                doc.width * 0.25,
-                doc.width * 0.18,
-                doc.width * 0.18,
-                doc.width * 0.19,
-                doc.width * 0.20,
-            ],
-        )
-
-        room_tbl.setStyle(
-            TableStyle(
-                [
-                    ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#e9f0ff")),
-                    ("TEXTCOLOR", (0, 0), (-1, 0), colors.HexColor("#0b5ed7")),
-                    ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
-                    ("ALIGN", (0, 0), (-1, -1), "CENTER"),
-                    ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
-                    ("FONTSIZE", (0, 0), (-1, -1), 9),
-                ]
-            )
-        )
-
-        story.append(room_tbl)
-        story.append(Spacer(1, 8))
-
     # ---------------- Payment Summary -------------------------------------------------------
-    story.append(Paragraph("Payment Summary:", header_style))
-
-    d_r = _f(data.get("double_rent"))
-    d_n = _f(data.get("double_rooms"))
-    t_r = _f(data.get("triple_rent_per_room"))
-    t_n = _f(data.get("triple_rooms"))
-
-    room_total = (d_r * d_n) + (t_r * t_n) if room_needed else 0
-    f_rent = _f(data.get("function_rent"))
-    clean = _f(data.get("cleaning_charges"))
-    sec = _f(data.get("security_charges"))
-    elec = _f(data.get("electricity_charges"))
-
-    try:
-        dt1 = datetime.strptime(data.get("checkin"), "%Y-%m-%dT%H:%M")
-        dt2 = datetime.strptime(data.get("checkout"), "%Y-%m-%dT%H:%M")
-        days = max(1, (dt2 - dt1).days)
-    except:
-        days = 1
-
-    per_day_total = room_total + f_rent + clean + sec
-    total_rent = per_day_total * days
-    balance = total_rent - advance_amt
+    totals = compute_totals(booking)
+    elec = totals["electricity_per_unit"]
+    total_rent = totals["total_rent"]
+    balance = totals["balance"]
 
-    pay_data = [["Description", "Value"]]
-
-    if room_needed:
-        pay_data.append(["Room Rent", _fmt(room_total)])
+    pay_rows = [["Description", "Value"]]
+    pay_rows.extend([label, _fmt(amount)] for label, amount in day_charges(booking, totals))
 
-    pay_data.extend([
-        ["Function Hall Rent", _fmt(f_rent)],
-        ["Cleaning", _fmt(clean)],
-        ["Security", _fmt(sec)],
+    pay_rows.extend([
         ["Electricity Charges", f"{_fmt(elec)} Rupees Per Unit"],
         ["Total Rent", _fmt(total_rent)],
     ])
 
     if advance_amt > 0:
-        pay_data.append(["Advance Paid", _fmt(advance_amt)])
-        pay_data.append(["Advance Payment Mode", advance_mode])
-        pay_data.append(["Balance", _fmt(balance)])
+        pay_rows.append(["Advance Paid", _fmt(advance_amt)])
+        pay_rows.append(["Advance Payment Mode", advance_mode])
+        pay_rows.append(["Balance", _fmt(balance)])
     else:
-        pay_data.append(["Balance", _fmt(total_rent)])
-
-    pay_tbl = Table(
-        pay_data,
-        colWidths=[doc.width * 0.65, doc.width * 0.35],
-    )
-
-    tbl_style = [
-        ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#f2f6ff")),
-        ("TEXTCOLOR", (0, 0), (-1, 0), colors.HexColor("#0b5ed7")),
-        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
-        ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
-        ("ALIGN", (0, 1), (-1, -1), "LEFT"),
-    ]
+        pay_rows.append(["Balance", _fmt(total_rent)])
 
     balance_row_idx = None
-    for i, row in enumerate(pay_data):
+    for i, row in enumerate(pay_rows):
         if i == 0:
             continue
         if str(row[0]).strip().lower() == "balance":
             balance_row_idx = i
             break
 
-    if balance_row_idx is not None:
-        tbl_style.append(("FONTNAME", (0, balance_row_idx), (-1, balance_row_idx), "Helvetica-Bold"))
-        tbl_style.append(("FONTSIZE", (0, balance_row_idx), (-1, balance_row_idx), 11))
+    # ---------------- Remarks -------------------------------------------------------------
+    remarks = booking.remarks
+
+    return {
+        "totals": totals,
+        "title_text": title_text,
+        "bill_no": booking.bill_no,
+        "timestamp": timestamp,
+        "variant": "confirmed" if advance_amt > 0 else "quotation",
+        "guest_rows": guest_rows,
+        "room_rows": room_rows,
+        "pay_rows": pay_rows,
+        "balance_row_idx": balance_row_idx,
+        "remarks": remarks.splitlines() if remarks else [],
+    }
+
+
+# MAIN GENERATOR -----------------------------------------------------------------------------------
+# "platypus" runs the flowable layout engine, "canvas" draws the fixed layout
+# directly (see fast_bill.py). Can be overridden per call.
+BILL_ENGINES = ("platypus", "canvas")
+BILL_ENGINE = os.environ.get("BILL_ENGINE", "platypus")
+
+# bills rendered by this process (next() on a count is atomic under the GIL)
+_renders = itertools.count(1)
+renders_completed = 0
+
+
+def generate_bill(booking, filepath=None, engine=None, compact=False):
+    """
+    Render the bill for `booking` (a Booking, or form fields to parse into one).
+    `compact` embeds the print-resolution logo and forces compressed page
+    streams, for a smaller file to send over mobile links.
+
+    By default the PDF is built in memory and a BytesIO positioned at 0 is
+    returned. Pass `filepath` to write to disk instead; the path is returned
+    and the caller owns the file (see generate_bill_file / remove_bill_file).
+    """
+    engine = engine or BILL_ENGINE
+    if engine not in BILL_ENGINES:
+        raise ValueError(f"unknown bill engine: {engine!r}")
+
+    if not isinstance(booking, Booking):
+        booking = Booking.from_form(booking)
+
+    target = filepath if filepath else BytesIO()
+
+    with metrics.in_flight("bill_renders_in_flight"):
+        with metrics.phase("story"):
+            content = bill_content(booking)
+            content["compact"] = compact
+            res = get_resources()
+
+        rendered = False
+        if engine == "canvas":
+            from fast_bill import render_canvas
+            rendered = render_canvas(content, target, res)
+
+        if not rendered:
+            engine = "platypus"
+            render_platypus(content, target, res)
+
+    metrics.inc("bill_renders_total", engine=engine)
+
+    # a muted render (the startup warm-up) does not count toward recycling the worker
+    if metrics.recording():
+        global renders_completed
+        renders_completed = next(_renders)
+
+    if filepath:
+        return filepath
+
+    target.seek(0)
+    return target
+
+
+def render_platypus(content, target, res):
+    with metrics.phase("story"):
+        doc, story = _platypus_story(content, target, res)
+
+    # BUILD PDF -------------------------------------------------------
+    def on_first(canvas, doc):
+        draw_header_page1(canvas, doc, content["title_text"], res, content["compact"], content["bill_no"])
+
+    def on_later(canvas, doc):
+        draw_footer_and_signatures_page2(canvas, doc)
+
+    with metrics.phase("layout"):
+        doc.build(story, onFirstPage=on_first, onLaterPages=on_later)
+
+
+def _platypus_story(content, target, res):
+    doc = SimpleDocTemplate(target, pagesize=A4, pageCompression=page_compression(content), **PAGE_MARGINS)
+
+    normal = res.normal
+    header_style = res.header_style
+
+    story = []
+
+    story.append(
+        Paragraph(
+            f'<para alignment="right"><font size=9>{content["timestamp"]}</font></para>',
+            normal,
+        )
+    )
+    story.append(Spacer(1, 4))
+
+    # ---------------- Guest Details ------------------------------------------------------
+    story.append(Paragraph("Guest Details:", header_style))
+
+    guest_tbl = Table(
+        content["guest_rows"],
+        colWidths=[doc.width * f for f in GUEST_COL_WIDTHS],
+    )
+
+    guest_tbl.setStyle(res.guest_table_style)
+
+    story.append(guest_tbl)
+    story.append(Spacer(1, 8))
+
+    # ---------------- Room Details -------------------------------------------------------
+    if content["room_rows"]:
+        story.append(Paragraph("Room Details:", header_style))
+
+        room_tbl = Table(
+            content["room_rows"],
+            colWidths=[doc.width * f for f in ROOM_COL_WIDTHS],
+        )
+
+        room_tbl.setStyle(res.room_table_style)
 
-    pay_tbl.setStyle(TableStyle(tbl_style))
+        story.append(room_tbl)
+        story.append(Spacer(1, 8))
+
+    # ---------------- Payment Summary -------------------------------------------------------
+    story.append(Paragraph("Payment Summary:", header_style))
+
+    pay_tbl = Table(
+        content["pay_rows"],
+        colWidths=[doc.width * f for f in PAY_COL_WIDTHS],
+    )
+
+    pay_tbl.setStyle(res.pay_table_style(content["balance_row_idx"]))
     story.append(pay_tbl)
     story.append(Spacer(1, 8))
 
     # ---------------- Remarks -------------------------------------------------------------
-    remarks = data.get("remarks", "").strip()
-    if remarks:
+    if content["remarks"]:
         story.append(Paragraph("Remarks:", header_style))
-        for line in remarks.splitlines():
+        for line in content["remarks"]:
             story.append(Paragraph(line, normal))
 
     # ---------------- PAGE 2 -------------------------------------------------------------
     story.append(PageBreak())
     ##story.append(Spacer(1, 4))
-    story.append(Paragraph("Important Terms & Conditions:", header_style))
-
-    if advance_amt > 0:
-        terms = [
-            "1. Event date once booked cannot be changed; advance amount is non-refundable.",
-            "2. Management is not responsible for loss or damage to guests’ personal belongings.",
-            "3. The function hall will be handed over 4 hours before the scheduled event time.",
-            "4. The customer named in the invoice will be held responsible for any damage or missing items belonging to the function hall.",
-            "5. Power-backup charges (2,500 rupees per hour) apply only if the generator is used.",
-            "6. Balance must be paid as soon as the event concludes.",
-            "7. Electricity meter reading starts when the hall is given to the decoration team.",
-            "8. Live cooking counter is not allowed inside the hall.",
-        ]
+    if USE_PAGE2_CACHE:
+        story.append(get_page2(content["variant"], res))
     else:
-        terms = [
-            "1. This quote is valid for only 7 days from the inquiry date. Your booking will be confirmed once we receive the advance payment.",
-            "2. Event date once booked cannot be changed; advance amount is non-refundable.",
-            "3. Management is not responsible for loss or damage to guests’ personal belongings.",
-            "4. The function hall will be handed over 4 hours before the scheduled event time.",
-            "5. The customer named in the invoice will be held responsible for any damage or missing items belonging to the function hall.",
-            "6. Power-backup charges (2,500 rupees per hour) apply only if the generator is used.",
-            "7. Balance must be paid as soon as the event concludes.",
-            "8. Electricity meter reading starts when the hall is given to the decoration team.",
-            "9. Live cooking counter is not allowed inside the hall.",
-        ]
+        story.extend(_page2_flowables(content["variant"], res))
 
-    for t in terms:
-        story.append(Paragraph(t, normal))
+    return doc, story
 
-    # BUILD PDF -------------------------------------------------------
-    def on_first(canvas, doc):
-        draw_header_page1(canvas, doc, title_text)
 
-    def on_later(canvas, doc):
-        draw_footer_and_signatures_page2(canvas, doc)
+def page_compression(content):
+    # None leaves it to rl_config (compressed unless configured otherwise)
+    return 1 if content["compact"] else None
+
+
+# ON-DISK MODE ------------------------------------------------------------------------------------
+def generate_bill_file(booking, engine=None, compact=False):
+    """Render the bill into a fresh temp file and return its path."""
+    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".pdf")
+    filepath = tmp.name
+    tmp.close()
 
-    doc.build(story, onFirstPage=on_first, onLaterPages=on_later)
+    try:
+        return generate_bill(booking, filepath, engine, compact)
+    except:
+        remove_bill_file(filepath)
+        raise
 
-    return filepath
+
+def remove_bill_file(filepath):
+    try:
+        os.remove(filepath)
+    except OSError:
+        pass
@@ -0,0 +1,113 @@
+import threading
+import time
+
+# ---------------------------------------------------------------------------------------------------
+# Admission control for synchronous renders.
+#
+# At most `max_concurrent` renders run at once and at most `max_queue` more may
+# wait for a slot. Anything beyond that is turned away immediately, and a
+# waiting request gives up once its latency budget (`timeout` seconds) is spent.
+#
+# SingleFlight sits in front of the gate: requests for a render that is already
+# running (a double-clicked Generate button) wait for it instead of taking a
+# slot of their own, and all of them get its result.
+# ---------------------------------------------------------------------------------------------------
+
+
+class Overloaded(Exception):
+    """Render queue is full; the request was not admitted."""
+
+
+class AdmissionTimeout(Exception):
+    """The request waited longer than its budget for a render slot."""
+
+
+class RenderGate:
+    def __init__(self, max_concurrent, max_queue, timeout):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.in_flight = 0
+        self.waiting = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        with self._cond:
+            if self.in_flight >= self.max_concurrent and self.waiting >= self.max_queue:
+                self.rejected += 1
+                raise Overloaded()
+
+            deadline = time.monotonic() + self.timeout
+            self.waiting += 1
+            try:
+                while self.in_flight >= self.max_concurrent:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.timed_out += 1
+                        raise AdmissionTimeout()
+                    self._cond.wait(remaining)
+            finally:
+                self.waiting -= 1
+            self.in_flight += 1
+
+    def release(self):
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class _Flight:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self):
+        self.leaders = 0
+        self.shared = 0
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        """
+        Return fn(), unless a call for `key` is already running in this process;
+        then wait for that call and return its result (or raise its exception).
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.leaders += 1
+            else:
+                self.shared += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = fn()
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
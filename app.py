@@ -1,76 +1,910 @@
-from flask import Flask, render_template, request, send_file, Response
-from Generate_Bill import generate_bill
+import startup  # first, so the imports below are counted in the startup log
+from flask import Flask, render_template, request, send_file, Response, jsonify, url_for, redirect
+from pdf_cache import PdfCache, booking_key
+from batch import BatchError, parse_bookings, stream_zip
+from jobs import JobQueue, QueueFull, DONE, FAILED
+from admission import RenderGate, SingleFlight, Overloaded, AdmissionTimeout
+import metrics
+from booking import Booking, BookingError, FIELDS as BOOKING_FIELDS
+from booking_store import BookingStore, StaleBooking
+from pricing import compute_totals, quote
+import reporting
+import export
+from availability import AvailabilityIndex, to_minutes
+from customers import CustomerIndex
+from bill_archive import BillArchive, ARCHIVE_SEGMENT_BYTES
+from assets import AssetStore, IMMUTABLE
+from auth import (
+    Authenticator, SESSION_COOKIE, DEFAULT_USER, DEFAULT_PASSWORD,
+    load_credentials, load_secret, save_credentials,
+)
+from werkzeug.security import generate_password_hash
+from werkzeug.datastructures import ContentRange
+from werkzeug.exceptions import RequestedRangeNotSatisfiable
+from datetime import datetime
+from io import BytesIO
+from urllib.parse import urlsplit
 import os
 
 app = Flask(__name__)
 
 # -----------------------------------
-# BASIC AUTH (USERNAME + PASSWORD)
+# STARTUP (see startup.py)
 # -----------------------------------
-USERNAME = "admin"
-PASSWORD = "bill123"
+# "warm" imports ReportLab and renders a throwaway bill in the background once
+# the app is up; "lazy" leaves that to the first real bill
+BILL_STARTUP = os.environ.get("BILL_STARTUP", "warm")
+if BILL_STARTUP not in startup.STARTUP_MODES:
+    raise ValueError(f"BILL_STARTUP must be one of {startup.STARTUP_MODES}, not {BILL_STARTUP!r}")
+STARTUP_LOG = os.environ.get("STARTUP_LOG", os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "Startuplog", "startup_log.txt"))
+startup_log = startup.StartupLog(STARTUP_LOG, BILL_STARTUP)
+startup_log.ready("imports")
+
+# -----------------------------------
+# BILL OUTPUT MODE
+# -----------------------------------
+# "memory" streams the PDF from a BytesIO buffer (no disk I/O).
+# "disk" renders to a temp file which is deleted once the response is sent.
+BILL_OUTPUT_MODE = os.environ.get("BILL_OUTPUT_MODE", "memory")
+BILL_DOWNLOAD_NAME = "bill.pdf"
+
+# compact bills embed a print-resolution logo and are about a fifth of the size;
+# BILL_COMPACT=1 makes them the default, ?compact=1|0 or the form's checkbox chooses
+BILL_COMPACT = os.environ.get("BILL_COMPACT", "0") == "1"
+
+# -----------------------------------
+# BOOKING STORE (SQLite)
+# -----------------------------------
+BOOKING_DB = os.environ.get("BOOKING_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "bookings.db"))
+with startup_log.phase("booking store"):
+    booking_store = BookingStore(BOOKING_DB)
+
+# -----------------------------------
+# BILL ARCHIVE (/bills/<bill number>)
+# -----------------------------------
+# the first PDF rendered for each bill number is kept in append-only segment files
+BILL_ARCHIVE_DIR = os.environ.get("BILL_ARCHIVE_DIR") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "archive")
+BILL_ARCHIVE_SEGMENT_BYTES = int(os.environ.get("BILL_ARCHIVE_SEGMENT_BYTES", ARCHIVE_SEGMENT_BYTES))
+with startup_log.phase("bill archive"):
+    bill_archive = BillArchive(BILL_ARCHIVE_DIR, BILL_ARCHIVE_SEGMENT_BYTES)
+
+# -----------------------------------
+# HALL AVAILABILITY (double-booking check)
+# -----------------------------------
+# a stay overlapping a confirmed booking (advance paid) is refused with 409
+# unless the form sends allow_overlap=1; quotations never block, and neither
+# does the booking a correction replaces
+availability = AvailabilityIndex()
+with startup_log.phase("availability index"):
+    availability.sync(booking_store)
+
+# -----------------------------------
+# CUSTOMER LOOKUP (/customers?q=, the form's name and mobile autocomplete)
+# -----------------------------------
+CUSTOMER_LOOKUP_LIMIT = 8
+customer_index = CustomerIndex()
+with startup_log.phase("customer index"):
+    customer_index.sync(booking_store)
+
+# -----------------------------------
+# REPORTS (/reports/<group>)
+# -----------------------------------
+# stored bookings as NumPy columns; new bookings are added on the next report
+report_ledger = reporting.Ledger()
+with startup_log.phase("report ledger"):
+    report_ledger.sync(booking_store)
+
+# -----------------------------------
+# STATIC ASSETS (/assets/<fingerprinted name>)
+# -----------------------------------
+# static/ is built once into resized, precompressed, content-hashed copies
+# (again whenever a source file changes); those URLs are cached for a year
+# and skip the login check
+ASSET_BUILD_DIR = os.environ.get("ASSET_BUILD_DIR") or os.path.join(app.static_folder, ".build")
+assets = AssetStore(app.static_folder, ASSET_BUILD_DIR)
+with startup_log.phase("static assets"):
+    assets.load()
+
+# -----------------------------------
+# RENDERED PDF CACHE
+# -----------------------------------
+# identical bookings are answered from memory (PDF_CACHE_MAX_BYTES=0 disables)
+PDF_CACHE_MAX_BYTES = int(os.environ.get("PDF_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+PDF_CACHE_MAX_ENTRIES = int(os.environ.get("PDF_CACHE_MAX_ENTRIES", 256))
+pdf_cache = PdfCache(PDF_CACHE_MAX_BYTES, PDF_CACHE_MAX_ENTRIES)
+
+# -----------------------------------
+# ASYNC RENDER JOBS (POST /generate?async=1)
+# -----------------------------------
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", 2))
+JOB_MAX_PENDING = int(os.environ.get("JOB_MAX_PENDING", 100))
+JOB_TTL_SECONDS = int(os.environ.get("JOB_TTL_SECONDS", 15 * 60))
+JOB_SPOOL_DIR = os.environ.get("JOB_SPOOL_DIR") or None
+render_jobs = JobQueue(JOB_WORKERS, JOB_MAX_PENDING, JOB_TTL_SECONDS, JOB_SPOOL_DIR)
+
+# -----------------------------------
+# RENDER ADMISSION CONTROL (synchronous /generate)
+# -----------------------------------
+RENDER_CONCURRENCY = int(os.environ.get("RENDER_CONCURRENCY", os.cpu_count() or 1))
+RENDER_QUEUE = int(os.environ.get("RENDER_QUEUE", 16))
+RENDER_WAIT_SECONDS = float(os.environ.get("RENDER_WAIT_SECONDS", 10))
+RENDER_RETRY_AFTER = "5"
+render_gate = RenderGate(RENDER_CONCURRENCY, RENDER_QUEUE, RENDER_WAIT_SECONDS)
+
+# identical renders already in progress in this process are shared, not repeated
+render_flights = SingleFlight()
+
+# -----------------------------------
+# METRICS (/metrics, Server-Timing)
+# -----------------------------------
+# add a Server-Timing header to every response (or per request with ?timing=1)
+SERVER_TIMING = os.environ.get("SERVER_TIMING", "0") == "1"
+
+metrics.gauge("bill_pdf_cache_hits_total", lambda: pdf_cache.hits, "PDF cache lookups that hit.", "counter")
+metrics.gauge("bill_pdf_cache_misses_total", lambda: pdf_cache.misses, "PDF cache lookups that missed.", "counter")
+metrics.gauge("bill_pdf_cache_hit_ratio",
+              lambda: round(pdf_cache.hits / ((pdf_cache.hits + pdf_cache.misses) or 1), 4),
+              "Share of PDF cache lookups that hit.")
+metrics.gauge("bill_pdf_cache_bytes", lambda: pdf_cache.size, "Bytes held in the PDF cache.")
+metrics.gauge("bill_pdf_cache_entries", lambda: len(pdf_cache), "Bills held in the PDF cache.")
+metrics.gauge("bill_render_gate_running", lambda: render_gate.in_flight, "Synchronous renders holding a slot.")
+metrics.gauge("bill_render_gate_waiting", lambda: render_gate.waiting, "Requests waiting for a render slot.")
+metrics.gauge("bill_render_gate_rejected_total", lambda: render_gate.rejected,
+              "Requests turned away with 503.", "counter")
+metrics.gauge("bill_render_gate_timed_out_total", lambda: render_gate.timed_out,
+              "Requests that timed out waiting.", "counter")
+metrics.gauge("bill_render_coalesced_total", lambda: render_flights.shared,
+              "Requests that shared a render already in progress.", "counter")
+
+# -----------------------------------
+# LOGIN (session cookie, or Basic auth for scripts)
+# -----------------------------------
+# users come from AUTH_FILE ("user:password hash" lines; python auth.py <user>
+# adds one). A missing file is created with the old admin login; the login page
+# warns while that password is still in use.
+AUTH_FILE = os.environ.get("AUTH_FILE") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "credentials.txt")
+SESSION_SECRET_FILE = os.environ.get("SESSION_SECRET_FILE") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), ".session_secret")
+SESSION_TTL_SECONDS = int(os.environ.get("SESSION_TTL_SECONDS", 12 * 60 * 60))
+
+with startup_log.phase("logins"):
+    if not os.path.exists(AUTH_FILE):
+        save_credentials(AUTH_FILE, {DEFAULT_USER: generate_password_hash(DEFAULT_PASSWORD)})
+        notice = f"Created {AUTH_FILE} with the default login; change it with: python auth.py {DEFAULT_USER}"
+        print(notice)
+        # the hidden (.vbs) launch has no console, so the startup log is where this is seen
+        startup_log.note(notice)
+    authenticator = Authenticator(load_credentials(AUTH_FILE), load_secret(SESSION_SECRET_FILE), SESSION_TTL_SECONDS)
+
+_default_login = None
 
-def check_auth(username, password):
-    return username == USERNAME and password == PASSWORD
+
+def default_login_in_use():
+    """Does DEFAULT_USER still have DEFAULT_PASSWORD? Worked out once: logins are only read at startup."""
+    global _default_login
+    if _default_login is None:
+        _default_login = authenticator.check_password(DEFAULT_USER, DEFAULT_PASSWORD)
+    return _default_login
+
+# reachable without logging in
+PUBLIC_ENDPOINTS = {"asset", "login", "logout"}
+
+metrics.gauge("bill_auth_cache_hits_total", lambda: authenticator.cache_hits,
+              "Logins answered from the verified-token cache.", "counter")
 
 def authenticate():
+    # a page load goes to the login form; scripts and fetch() calls get a Basic challenge
+    if request.method == "GET" and request.accept_mimetypes.accept_html:
+        return redirect(url_for("login", next=request.full_path.rstrip("?")))
     return Response(
         "Access Denied", 401,
         {"WWW-Authenticate": 'Basic realm="Login Required"'}
     )
 
+# the form page is served from here on; ReportLab loads in the background (warm) or on first use
+startup_log.ready("app loaded")
+warm_up = startup.WarmUp(startup_log).start() if BILL_STARTUP == "warm" else None
+
+def bills():
+    """Generate_Bill, imported on first use rather than when the app loads."""
+    import Generate_Bill
+    return Generate_Bill
+
+@app.before_request
+def start_timing():
+    metrics.start_request()
+
+
 @app.before_request
 def require_auth():
-    auth = request.authorization
-    if not auth or not check_auth(auth.username, auth.password):
+    if request.endpoint in PUBLIC_ENDPOINTS:
+        return
+    with metrics.phase("auth"):
+        user = authenticator.verify(request.cookies.get(SESSION_COOKIE))
+        auth = request.authorization
+        if user is None and auth and auth.type == "basic":
+            user = authenticator.verify_basic(auth.username, auth.password or "")
+    if user is None:
         return authenticate()
 
+
+@app.after_request
+def finish_timing(response):
+    timings, total = metrics.finish_request()
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    metrics.observe("bill_request_seconds", total, route=route)
+    if SERVER_TIMING or request.args.get("timing") == "1":
+        response.headers["Server-Timing"] = metrics.server_timing(timings, total)
+    return response
+
+# -----------------------------------
+# BOOKING FORM (fields: booking.FIELDS)
+# -----------------------------------
+# form flags that change how /generate handles a booking, not part of it
+OVERLAP_FLAG = "allow_overlap"
+# id of the stored booking a submission corrects; that booking is replaced, not added to
+REPLACES_FIELD = "booking_id"
+IDEMPOTENCY_FIELD = "idempotency_key"   # or an Idempotency-Key header
+
 # -----------------------------------
 # ROUTES
 # -----------------------------------
+@app.context_processor
+def asset_urls():
+    def asset_url(name):
+        built = assets.built_name(name)
+        if built is None:
+            return url_for("static", filename=name)
+        return url_for("asset", filename=built)
+    return {"asset_url": asset_url}
+
+
 @app.route('/')
 def home():
     return render_template('index.html')
 
 
+def _safe_next(target):
+    # only paths on this site, so the login form cannot be used to bounce elsewhere.
+    # Browsers read a backslash as "/" and drop tabs and newlines, so "/\evil.example"
+    # and "/<tab>/evil.example" both mean "//evil.example"
+    if target and target.startswith("/") and "\\" not in target and target.isprintable():
+        parts = urlsplit(target)
+        if not parts.scheme and not parts.netloc:
+            return target
+    return url_for("home")
+
+
+@app.route('/login', methods=['GET', 'POST'])
+def login():
+    target = _safe_next(request.values.get("next"))
+    if request.method == "GET":
+        return login_page(target)
+
+    user = request.form.get("username", "")
+    if not authenticator.check_password(user, request.form.get("password", "")):
+        return login_page(target, error="Wrong username or password"), 401
+
+    response = redirect(target)
+    response.set_cookie(SESSION_COOKIE, authenticator.issue(user), max_age=SESSION_TTL_SECONDS,
+                        httponly=True, samesite="Lax", secure=request.is_secure)
+    return response
+
+
+def login_page(target, error=None):
+    return render_template(
+        "login.html", next=target, error=error,
+        default_login=default_login_in_use(), default_user=DEFAULT_USER,
+    )
+
+
+@app.route('/logout', methods=['POST'])
+def logout():
+    response = redirect(url_for("login"))
+    response.delete_cookie(SESSION_COOKIE)
+    return response
+
+
+@app.route('/assets/<path:filename>')
+def asset(filename):
+    found = assets.pick(filename, request.accept_encodings)
+    if found is None:
+        return Response("Not found", 404)
+    path, mimetype, encoding = found
+    response = send_file(path, mimetype=mimetype, conditional=True, etag=filename)
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    response.headers["Vary"] = "Accept-Encoding"
+    response.headers["Cache-Control"] = IMMUTABLE
+    return response
+
+
 @app.route('/generate', methods=['POST'])
 def generate():
-    booking_data = {
-        "name": request.form.get('name'),
-        "pax": request.form.get('pax'),
-        "mobile": request.form.get('mobile'),
-        "event_type": request.form.get('event_type'),
+    with metrics.phase("parse"):
+        try:
+            booking = Booking.from_form(request.form)
+        except BookingError as e:
+            return invalid_booking(e)
+
+    # ?engine=canvas|platypus picks the renderer for this request only
+    engine = request.args.get("engine") or None
+    if engine and engine not in bills().BILL_ENGINES:
+        return Response(f"Unknown engine: {engine}", 400)
+
+    compact = wants_compact()
+
+    replaces = request.form.get(REPLACES_FIELD) or None
+    if replaces is not None:
+        stored = booking_store.get(int(replaces)) if replaces.isdigit() else None
+        if stored is None:
+            return jsonify(error="Unknown booking"), 404
+        if stored["voided_at"]:
+            return stale_booking(stored)
+        replaces = stored["id"]
+
+    with metrics.phase("availability"):
+        conflicts = booking_conflicts(booking, replaces)
+    clashes = [s for s in conflicts if s.confirmed]
+    if clashes and request.form.get(OVERLAP_FLAG) != "1":
+        return jsonify(
+            error="The hall is already booked for part of this stay",
+            conflicts=[s.to_dict() for s in clashes],
+        ), 409
+
+    try:
+        booking_id = record_booking(booking, replaces)
+    except StaleBooking:
+        return stale_booking(booking_store.get(replaces))
+
+    # the key names the bill's content and number, so a client holding it already has this bill
+    key = bill_key(booking, engine, compact)
+    if request.if_none_match.contains(key):
+        return Response(status=304, headers={"ETag": f'"{key}"'})
+
+    # one submission sent twice (double click) shares a single render
+    idempotency_key = request.headers.get("Idempotency-Key") or request.form.get(IDEMPOTENCY_FIELD)
+    flight_key = f"idem:{idempotency_key}:{engine or bills().BILL_ENGINE}:{int(compact)}" if idempotency_key else None
+
+    response = bill_response(booking, engine, key, compact, request.args.get("async") == "1", flight_key)
+    response.headers["X-Booking-Id"] = str(booking_id)
+    response.headers["X-Bill-No"] = str(booking.bill_no)
+    if conflicts:
+        response.headers["X-Booking-Conflicts"] = ",".join(str(s.booking_id) for s in conflicts)
+    return response
+
+
+def wants_compact():
+    value = request.values.get("compact")
+    if value is None:
+        return BILL_COMPACT
+    return value in ("1", "on", "true")
+
+
+def bill_key(booking, engine, compact):
+    """
+    Cache key / ETag for the bill bytes: the booking, the bill number and time
+    printed on it, and everything else that changes the render.
+    """
+    booked_at = booking.booked_at.isoformat() if booking.booked_at else None
+    extra = [booking.bill_no, booked_at, engine or bills().BILL_ENGINE]
+    if compact:
+        extra.append("compact")
+    return booking_key(booking.form, *extra)
 
-        "checkin": request.form.get('checkin'),
-        "checkout": request.form.get('checkout'),
 
-        "room_needed": request.form.get('room_needed'),
+def invalid_booking(error):
+    return jsonify(error="Invalid booking", fields=error.errors), 400
 
-        "double_rooms": request.form.get('double_rooms'),
-        "double_extra": request.form.get('double_extra'),
-        "double_ac": request.form.get('double_ac'),
-        "double_rent": request.form.get('double_rent'),
 
-        "triple_rooms": request.form.get('triple_rooms'),
-        "triple_extra_bed": request.form.get('triple_extra_bed'),
-        "triple_ac": request.form.get('triple_ac'),
-        "triple_rent_per_room": request.form.get('triple_rent_per_room'),
+def stale_booking(stored):
+    if stored["replaced_by"]:
+        error = f"Booking {stored['id']} was already replaced by booking {stored['replaced_by']}"
+    else:
+        error = f"Booking {stored['id']} was cancelled"
+    return jsonify(error=error, replaced_by=stored["replaced_by"]), 409
 
-        "function_rent": request.form.get('function_rent'),
-        "cleaning_charges": request.form.get('cleaning_charges'),
-        "security_charges": request.form.get('security_charges'),
-        "electricity_charges": request.form.get('electricity_charges'),
 
-        "advance": request.form.get('advance'),
-        "advance_mode": request.form.get('advance_mode'),  # ✔ FIXED KEY
+def booking_conflicts(booking, replaces=None):
+    """
+    Stored stays overlapping this booking's, not counting the booking itself
+    or the booking it replaces.
+    """
+    availability.sync(booking_store)
+    stored = booking_store.find_by_key(booking_key(booking.form))
+    return availability.conflicts(
+        booking.checkin, booking.checkout,
+        exclude_ids={stored["id"] if stored else None, replaces},
+    )
+
+
+def batch_clashes(bookings):
+    """
+    Confirmed stays each booking of a batch would overlap: stored ones, and
+    earlier confirmed bookings of the same batch (numbered from 1, as in errors).
+    """
+    in_batch = AvailabilityIndex()
+    found = []
+    for n, booking in enumerate(bookings, 1):
+        clashes = [s.to_dict() for s in booking_conflicts(booking) if s.confirmed]
+        clashes += [
+            dict(s.to_dict(), id=None, booking=s.booking_id)
+            for s in in_batch.conflicts(booking.checkin, booking.checkout) if s.confirmed
+        ]
+        if clashes:
+            found.append({"booking": n, "conflicts": clashes})
+        in_batch.add(n, booking.checkin, booking.checkout, booking.confirmed, booking.name, booking.event_type)
+    return found
+
+
+def record_booking(booking, replaces=None):
+    """
+    Save the booking (or find it, if this exact booking was saved before) and
+    pin its booked_at, so the timestamp line and cached bytes stay stable.
+    With `replaces`, the booking is a correction of that stored booking, which
+    is voided (StaleBooking if it already was).
+    """
+    bkey = booking_key(booking.form)
+    stored = booking_store.find_by_key(bkey)
+    if stored is None or replaces not in (None, stored["id"]):
+        booking.booked_at = datetime.now(bills().IST)
+        stored = booking_store.save(booking.as_form(), bkey, compute_totals(booking), replaces)
+    booking.booked_at = datetime.fromisoformat(stored["booked_at"])
+    booking.bill_no = stored["bill_no"]
+    if replaces is not None and replaces != stored["id"]:
+        forget_booking(replaces)
+    availability.add(
+        stored["id"], booking.checkin, booking.checkout, booking.confirmed,
+        booking.name, booking.event_type,
+    )
+    customer_index.add(stored["id"], booking.form, stored["booked_at"])
+    return stored["id"]
+
+
+def forget_booking(booking_id):
+    """Take a voided booking out of this process's indexes (others catch up on their next sync)."""
+    availability.remove(booking_id)
+    customer_index.remove(booking_id)
+
+
+def bill_response(booking, engine, key, compact=False, async_mode=False, flight_key=None):
+    """
+    Serve the bill from the PDF cache, a background job or a fresh render.
+    Renders with the same `flight_key` (default: the content key) that overlap
+    in time run once; every request gets the first one's bytes.
+    """
+    flight_key = flight_key or key
+    pdf = pdf_cache.get(key)
+    if pdf is not None:
+        archive_bill(booking, pdf)
+        if async_mode:
+            return job_accepted(render_jobs.completed(pdf, key))
+        return pdf_response(pdf, key)
+
+    if async_mode:
+        try:
+            job = render_jobs.submit(
+                lambda: render_flights.do(flight_key, lambda: render_pdf(booking, engine, key, compact))[0], key
+            )
+        except QueueFull:
+            return busy("Render queue is full, try again shortly")
+        return job_accepted(job)
+
+    def gated_render():
+        with render_gate:
+            return render_pdf(booking, engine, key, compact)
+
+    try:
+        if BILL_OUTPUT_MODE == "disk":
+            # each response owns and deletes its file, so disk renders are not shared
+            with render_gate:
+                filepath = bills().generate_bill_file(booking, engine, compact)
+        else:
+            pdf, key = render_flights.do(flight_key, gated_render)
+    except Overloaded:
+        return busy("Too many bills being generated, try again shortly")
+    except AdmissionTimeout:
+        return busy("Timed out waiting to generate the bill, try again shortly")
+
+    if BILL_OUTPUT_MODE == "disk":
+        if pdf_cache.enabled or booking.bill_no is not None:
+            with open(filepath, "rb") as f:
+                pdf = f.read()
+            pdf_cache.put(key, pdf)
+            archive_bill(booking, pdf)
+        with metrics.phase("send"):
+            response = send_file(filepath, as_attachment=True, download_name=BILL_DOWNLOAD_NAME)
+            response.set_etag(key)
+        response.call_on_close(lambda: bills().remove_bill_file(filepath))
+        return response
+
+    return pdf_response(pdf, key)
+
+
+def busy(message):
+    return Response(message, 503, {"Retry-After": RENDER_RETRY_AFTER})
+
+
+def render_pdf(booking, engine, key, compact=False):
+    """Render and cache the bill; returns (pdf bytes, key) so shared callers get the ETag too."""
+    pdf = bills().generate_bill(booking, engine=engine, compact=compact).getvalue()
+    pdf_cache.put(key, pdf)
+    archive_bill(booking, pdf)
+    return pdf, key
+
+
+def archive_bill(booking, pdf):
+    """Keep the first PDF rendered for a numbered bill (later re-issues are not stored again)."""
+    if booking.bill_no is not None and booking.bill_no not in bill_archive:
+        with metrics.phase("archive"):
+            bill_archive.put(booking.bill_no, pdf)
+
+
+def job_accepted(job):
+    body = job.to_dict()
+    body["url"] = url_for("job_status", job_id=job.id)
+    response = jsonify(body)
+    response.status_code = 202
+    response.headers["Location"] = body["url"]
+    return response
+
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    """Job status as JSON, or the PDF itself once the job is done."""
+    job = render_jobs.get(job_id)
+    if job is None:
+        return jsonify(error="Unknown or expired job"), 404
+    if job.status == DONE:
+        return pdf_response(job.result, job.key)
+    if job.status == FAILED:
+        return jsonify(job.to_dict()), 500
+    return jsonify(job.to_dict())
+
+
+@app.route('/generate/batch', methods=['POST'])
+def generate_batch():
+    """
+    Render many bookings at once. Body is a JSON array or CSV (raw, or as an
+    uploaded "file") with the same field names as the booking form.
+    """
+    engine = request.args.get("engine") or None
+    if engine and engine not in bills().BILL_ENGINES:
+        return Response(f"Unknown engine: {engine}", 400)
+
+    upload = request.files.get("file")
+    if upload:
+        body, content_type = upload.read(), upload.mimetype
+    else:
+        body, content_type = request.get_data(), request.content_type
+
+    try:
+        bookings = parse_bookings(body, content_type, BOOKING_FIELDS)
+    except BatchError as e:
+        return Response(str(e), 400)
+
+    with metrics.phase("availability"):
+        clashes = batch_clashes(bookings)
+    if clashes and request.values.get(OVERLAP_FLAG) != "1":
+        return jsonify(error="The hall is already booked for part of these stays", bookings=clashes), 409
+
+    for booking in bookings:
+        record_booking(booking)
+
+    return Response(
+        # numbered like any other bill, so each is archived as issued
+        stream_zip(bookings, engine, wants_compact(), on_bill=archive_bill),
+        mimetype="application/zip",
+        headers={"Content-Disposition": "attachment; filename=bills.zip"},
+    )
+
+
+@app.route('/bookings')
+def list_bookings():
+    """
+    Stored bookings, newest first. Filters: from/to (stay overlaps window),
+    mobile, created_from/created_to, limit. ?voided=1 includes replaced and
+    cancelled bookings.
+    """
+    try:
+        limit = min(int(request.args.get("limit", 100)), 1000)
+    except ValueError:
+        return jsonify(error="limit must be a number"), 400
+    return jsonify(booking_store.search(
+        start=request.args.get("from"),
+        end=request.args.get("to"),
+        mobile=request.args.get("mobile"),
+        created_from=request.args.get("created_from"),
+        created_to=request.args.get("created_to"),
+        limit=limit,
+        voided=request.args.get("voided") == "1",
+    ))
+
+
+@app.route('/bookings/<int:booking_id>')
+def booking_detail(booking_id):
+    """A stored booking with its form fields, e.g. to load it into the form for a correction."""
+    booking = booking_store.get(booking_id)
+    if booking is None:
+        return jsonify(error="Unknown booking"), 404
+    return jsonify(booking)
+
+
+@app.route('/bookings/<int:booking_id>/cancel', methods=['POST'])
+def cancel_booking(booking_id):
+    """Cancel a booking: it frees its dates and leaves the reports. Its bill stays on file."""
+    stored = booking_store.get(booking_id)
+    if stored is None:
+        return jsonify(error="Unknown booking"), 404
+    try:
+        booking_store.void(booking_id)
+    except StaleBooking:
+        return stale_booking(booking_store.get(booking_id))
+    forget_booking(booking_id)
+    return jsonify(booking_store.get(booking_id))
+
 
-        "remarks": request.form.get('remarks')
+@app.route('/bookings/export')
+def export_bookings():
+    """
+    Every booking matching the /bookings filters (no limit) as a CSV download
+    with its computed payment lines, streamed as it is read.
+    """
+    rows = booking_store.iter_bookings(
+        start=request.args.get("from"),
+        end=request.args.get("to"),
+        mobile=request.args.get("mobile"),
+        created_from=request.args.get("created_from"),
+        created_to=request.args.get("created_to"),
+        voided=request.args.get("voided") == "1",
+    )
+    return Response(
+        export.stream_csv(rows),
+        mimetype="text/csv",
+        headers={"Content-Disposition": "attachment; filename=bookings.csv"},
+    )
+
+
+@app.route('/bookings/<int:booking_id>/bill')
+def booking_bill(booking_id):
+    """Re-issue the bill for a stored booking, identical to the original."""
+    booking = booking_store.get(booking_id)
+    if booking is None:
+        return jsonify(error="Unknown booking"), 404
+
+    engine = request.args.get("engine") or None
+    if engine and engine not in bills().BILL_ENGINES:
+        return Response(f"Unknown engine: {engine}", 400)
+
+    try:
+        stored = Booking.from_form(booking["data"])
+    except BookingError as e:
+        # saved before the form was validated on the server
+        return invalid_booking(e)
+    stored.bill_no = booking["bill_no"]
+
+    compact = wants_compact()
+    key = bill_key(stored, engine, compact)
+    if request.if_none_match.contains(key):
+        return Response(status=304, headers={"ETag": f'"{key}"'})
+
+    return bill_response(stored, engine, key, compact)
+
+
+@app.route('/bills/<int:number>')
+def archived_bill(number):
+    """
+    Bill `number` exactly as it was first issued, from the archive. Supports
+    Range requests. A numbered bill that was never archived (issued before the
+    archive existed) is rendered from its stored booking and archived now.
+    """
+    etag = f"bill-{number}"
+    if request.if_none_match.contains(etag):
+        return Response(status=304, headers={"ETag": f'"{etag}"'})
+
+    with metrics.phase("archive"):
+        pdf = bill_archive.get(number)
+    if pdf is None:
+        stored = booking_store.get_by_bill_no(number)
+        if stored is None:
+            return jsonify(error="Unknown bill number"), 404
+        try:
+            booking = Booking.from_form(stored["data"], strict=False)
+        except BookingError as e:
+            return invalid_booking(e)
+        booking.bill_no = number
+        try:
+            with render_gate:
+                render_pdf(booking, None, bill_key(booking, None, False))
+        except Overloaded:
+            return busy("Too many bills being generated, try again shortly")
+        except AdmissionTimeout:
+            return busy("Timed out waiting to generate the bill, try again shortly")
+        pdf = bill_archive.get(number)
+
+    # only the requested bytes are copied out of the mapped segment
+    start, stop, status = 0, len(pdf), 200
+    if request.range is not None:
+        bounds = request.range.range_for_length(len(pdf))
+        if bounds is None:
+            raise RequestedRangeNotSatisfiable(len(pdf))
+        (start, stop), status = bounds, 206
+
+    with metrics.phase("send"):
+        response = Response(pdf[start:stop].tobytes(), status, mimetype="application/pdf")
+        if status == 206:
+            response.content_range = ContentRange("bytes", start, stop, len(pdf))
+        response.accept_ranges = "bytes"
+        response.headers["Content-Disposition"] = f"attachment; filename=bill-{number:06d}.pdf"
+        response.set_etag(etag)
+    return response
+
+
+@app.route('/customers')
+def customer_lookup():
+    """
+    Past customers whose name (any word) or mobile starts with ?q=, latest
+    booking first, each with the values of that booking to pre-fill the form.
+    """
+    try:
+        limit = min(max(int(request.args.get("limit", CUSTOMER_LOOKUP_LIMIT)), 1), 50)
+    except ValueError:
+        return jsonify(error="limit must be a number"), 400
+    customer_index.sync(booking_store)
+    with metrics.phase("lookup"):
+        found = customer_index.search(request.args.get("q", ""), limit)
+    return jsonify(customers=found)
+
+
+@app.route('/api/quote', methods=['POST'])
+def api_quote():
+    """
+    Price a booking without rendering it. Takes the billForm fields as a form
+    post or a JSON object; the form calls this for its live totals.
+    """
+    form = request.get_json(silent=True)
+    if not isinstance(form, dict):
+        form = request.form
+    try:
+        booking = Booking.from_form(form, strict=False)
+    except BookingError as e:
+        return invalid_booking(e)
+    return jsonify(quote(booking))
+
+
+@app.route('/reports/<group>')
+def report(group):
+    """
+    Revenue, advance, outstanding balance and occupancy grouped by day, month,
+    event_type or payment_mode. ?basis=event|booked picks the date a booking
+    counts on, from/to (YYYY-MM-DD, to exclusive) limit it, ?format=csv.
+    """
+    try:
+        start = reporting.parse_day(request.args.get("from"))
+        end = reporting.parse_day(request.args.get("to"))
+        report_ledger.sync(booking_store)
+        rows = report_ledger.report(group, request.args.get("basis", "event"), start, end)
+    except reporting.ReportError as e:
+        return jsonify(error=str(e)), 400
+
+    if request.args.get("format") == "csv":
+        return Response(
+            reporting.to_csv(rows, group),
+            mimetype="text/csv",
+            headers={"Content-Disposition": f"attachment; filename=report-{group}.csv"},
+        )
+    return jsonify(rows)
+
+
+@app.route('/availability')
+def availability_check():
+    """
+    Is the hall free for checkin..checkout? Lists every overlapping stay,
+    except booking ?exclude=<id> (the one being corrected).
+    """
+    checkin, checkout = request.args.get("checkin"), request.args.get("checkout")
+    if not checkin or not checkout:
+        return jsonify(error="checkin and checkout are required"), 400
+    fields = {
+        name: "must be a date and time (YYYY-MM-DDTHH:MM)"
+        for name, raw in (("checkin", checkin), ("checkout", checkout)) if to_minutes(raw) is None
     }
+    if not fields and to_minutes(checkout) <= to_minutes(checkin):
+        fields["checkout"] = "must be after checkin"
+    if fields:
+        return jsonify(error="Invalid stay", fields=fields), 400
+    exclude = request.args.get("exclude", "")
+
+    availability.sync(booking_store)
+    conflicts = availability.conflicts(checkin, checkout, {int(exclude)} if exclude.isdigit() else ())
+    return jsonify(
+        free=not any(s.confirmed for s in conflicts),
+        conflicts=[s.to_dict() for s in conflicts],
+    )
+
+
+@app.route('/availability/<int:year>/<int:month>')
+def availability_month(year, month):
+    """Stays touching each day of a month, for a calendar view."""
+    if not 1 <= month <= 12 or not 1 <= year <= 9999:
+        return jsonify(error="Unknown month"), 404
+
+    availability.sync(booking_store)
+    days = availability.month(year, month)
+    return jsonify(
+        year=year,
+        month=month,
+        days={
+            day: {
+                "booked": any(s.confirmed for s in stays),
+                "stays": [s.to_dict() for s in stays],
+            }
+            for day, stays in days.items()
+        },
+    )
+
+
+def pdf_response(pdf, key):
+    with metrics.phase("send"):
+        response = send_file(
+            BytesIO(pdf),
+            mimetype="application/pdf",
+            as_attachment=True,
+            download_name=BILL_DOWNLOAD_NAME,
+        )
+        response.set_etag(key)
+    return response
+
+
+@app.route('/metrics')
+def metrics_endpoint():
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+# -----------------------------------
+# ENTRY POINT
+# -----------------------------------
+def main(argv=None):
+    import argparse
+    import tempfile
+    import serve
+
+    parser = argparse.ArgumentParser(prog="python -m app", description="Function hall bill app")
+    parser.add_argument("command", nargs="?", default="serve", choices=["serve"])
+    parser.add_argument("--host", default=os.environ.get("BILL_HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("BILL_PORT", 5000)))
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("BILL_WORKERS", 2)),
+                        help="worker processes sharing the port (1 on platforms without fork)")
+    parser.add_argument("--max-renders", type=int, default=os.environ.get("BILL_MAX_RENDERS"),
+                        help="restart a worker after this many bills (0 = never; default 1000 with "
+                             "pre-forked workers, never in a single process)")
+    parser.add_argument("--debug", action="store_true",
+                        help="run the Flask development server with the debugger and reloader")
+    args = parser.parse_args(argv)
+
+    if args.debug:
+        app.run(host=args.host, port=args.port, debug=True)
+        return
+
+    prefork = args.workers > 1 and serve.can_fork()
+    if args.max_renders is None:
+        args.max_renders = serve.MAX_RENDERS_PER_WORKER if prefork else 0
+
+    if prefork:
+        # forked workers share what the parent has loaded, so load it all before
+        # forking; and a warm-up thread must not be mid-import when fork() runs
+        if warm_up is not None:
+            warm_up.wait()
+        import fast_bill  # noqa: F401
+        bills().warm_page2_cache()
 
-    filepath = generate_bill(booking_data)
+    # async job status must be visible from every worker process
+    if prefork and render_jobs.spool_dir is None:
+        render_jobs.spool_dir = tempfile.mkdtemp(prefix="bill-jobs-")
 
-    return send_file(filepath, as_attachment=True)
+    serve.serve(app, args.host, args.port, args.workers, args.max_renders)
 
 
 if __name__ == '__main__':
-    app.run(host="0.0.0.0", port=5000, debug=True)
+    main()
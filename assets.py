@@ -0,0 +1,180 @@
+import gzip
+import hashlib
+import io
+import json
+import mimetypes
+import os
+import sys
+import threading
+
+try:
+    import brotli
+except ImportError:      # optional: without it only gzip copies are built
+    brotli = None
+
+# ---------------------------------------------------------------------------------------------------
+# Static asset pipeline for the form page.
+#
+# build() copies every file in static/ into a build directory under a
+# content-hashed name (logo.png -> logo.3f9a1c2b7d.png), so a changed file
+# always gets a new URL and the old one can be cached forever. Images are
+# scaled to twice the size the page shows them at and saved as palette PNGs;
+# text assets also get .gz and .br copies, compressed once at build time.
+# manifest.json maps each source name to its built name and its encodings.
+#
+# AssetStore loads the manifest (rebuilding first if a source is newer),
+# gives templates the fingerprinted URLs and picks the best encoding the
+# client accepts for each request.
+# ---------------------------------------------------------------------------------------------------
+
+MANIFEST = "manifest.json"
+BUILD_VERSION = 1        # bump when build settings change so old builds are redone
+
+# widest each image is shown on the page, in CSS px; built at 2x for high-DPI screens
+WEB_IMAGE_WIDTHS = {
+    "logo.png": 180,
+    "PK.png": 28,
+}
+WEB_IMAGE_SCALE = 2
+
+TEXT_EXTENSIONS = (".css", ".js", ".svg", ".json", ".txt")
+ENCODINGS = ("br", "gzip")    # preferred first, when the client accepts both equally
+
+# served with Cache-Control: the URL changes whenever the content does
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+def _web_image(data, css_width):
+    from PIL import Image
+    im = Image.open(io.BytesIO(data))
+    im.load()
+    width = css_width * WEB_IMAGE_SCALE
+    if im.width > width:
+        im = im.resize((width, round(im.height * width / im.width)), Image.LANCZOS)
+    if im.mode not in ("RGB", "RGBA"):
+        im = im.convert("RGBA")
+    # logos and badges use a handful of colours, so a 256-colour palette is lossless to the eye
+    im = im.quantize(256, method=Image.Quantize.FASTOCTREE)
+    out = io.BytesIO()
+    im.save(out, "PNG", optimize=True)
+    return out.getvalue() if out.tell() < len(data) else data
+
+
+def _compressed(data):
+    """{encoding: bytes} for the encodings that make `data` smaller."""
+    copies = {"gzip": gzip.compress(data, 9, mtime=0)}
+    if brotli is not None:
+        copies["br"] = brotli.compress(data, quality=11)
+    return {enc: body for enc, body in copies.items() if len(body) < len(data)}
+
+
+def _write(path, data):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _sources(src_dir):
+    entries = (e for e in os.scandir(src_dir) if e.is_file() and not e.name.startswith("."))
+    return sorted(entries, key=lambda e: e.name)
+
+
+def build(src_dir, out_dir):
+    """Build every asset in `src_dir` into `out_dir` and return the manifest."""
+    os.makedirs(out_dir, exist_ok=True)
+    files = {}
+    for entry in _sources(src_dir):
+        with open(entry.path, "rb") as f:
+            data = f.read()
+        if entry.name in WEB_IMAGE_WIDTHS:
+            data = _web_image(data, WEB_IMAGE_WIDTHS[entry.name])
+
+        stem, ext = os.path.splitext(entry.name)
+        built = f"{stem}.{hashlib.sha256(data).hexdigest()[:10]}{ext}"
+        _write(os.path.join(out_dir, built), data)
+
+        encodings = {}
+        if ext.lower() in TEXT_EXTENSIONS:
+            for enc, body in _compressed(data).items():
+                _write(os.path.join(out_dir, f"{built}.{enc}"), body)
+                encodings[enc] = len(body)
+        files[entry.name] = {"file": built, "bytes": len(data), "source_bytes": entry.stat().st_size,
+                             "encodings": encodings}
+
+    manifest = {"version": BUILD_VERSION, "files": files}
+    _write(os.path.join(out_dir, MANIFEST), json.dumps(manifest, indent=2).encode())
+
+    keep = {MANIFEST} | {a["file"] for a in files.values()} | {
+        f"{a['file']}.{enc}" for a in files.values() for enc in a["encodings"]
+    }
+    for entry in os.scandir(out_dir):
+        if entry.is_file() and entry.name not in keep and not entry.name.endswith(".tmp"):
+            os.remove(entry.path)
+    return manifest
+
+
+class AssetStore:
+    def __init__(self, src_dir, out_dir):
+        self.src_dir = src_dir
+        self.out_dir = out_dir
+        self._urls = {}       # source name -> built name
+        self._built = {}      # built name -> tuple of precompressed encodings
+        self._lock = threading.Lock()
+
+    def _stale(self):
+        path = os.path.join(self.out_dir, MANIFEST)
+        try:
+            built_at = os.stat(path).st_mtime
+            with open(path) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if manifest.get("version") != BUILD_VERSION:
+            return None
+        if any(e.stat().st_mtime > built_at for e in _sources(self.src_dir)):
+            return None
+        if set(manifest["files"]) != {e.name for e in _sources(self.src_dir)}:
+            return None
+        return manifest
+
+    def load(self):
+        """Read the manifest, building the assets first if it is missing or out of date."""
+        with self._lock:
+            manifest = self._stale() or build(self.src_dir, self.out_dir)
+            self._urls = {name: a["file"] for name, a in manifest["files"].items()}
+            self._built = {a["file"]: tuple(e for e in ENCODINGS if e in a["encodings"])
+                           for a in manifest["files"].values()}
+        return manifest
+
+    def built_name(self, name):
+        """Fingerprinted name for source file `name`, or None if it was not built."""
+        return self._urls.get(name)
+
+    def pick(self, built, accept_encodings):
+        """
+        (path, mimetype, encoding) to send for fingerprinted file `built`, or None
+        if there is no such file. `accept_encodings` maps an encoding to the
+        quality the client gave it (werkzeug's request.accept_encodings);
+        encoding is None when the plain file is the best choice.
+        """
+        encodings = self._built.get(built)
+        if encodings is None:
+            return None
+        mimetype = mimetypes.guess_type(built)[0] or "application/octet-stream"
+        best, best_q = None, 0
+        for enc in encodings:
+            q = accept_encodings[enc]
+            if q > best_q:
+                best, best_q = enc, q
+        path = os.path.join(self.out_dir, built + (f".{best}" if best else ""))
+        return path, mimetype, best
+
+
+if __name__ == "__main__":
+    here = os.path.dirname(os.path.abspath(__file__))
+    src = sys.argv[1] if len(sys.argv) > 1 else os.path.join(here, "static")
+    out = sys.argv[2] if len(sys.argv) > 2 else os.path.join(src, ".build")
+    for name, a in build(src, out)["files"].items():
+        encodings = "  ".join(f"{enc} {size:,} B" for enc, size in a["encodings"].items())
+        print(f"{name:14} {a['source_bytes']:>9,} B -> {a['file']:28} {a['bytes']:>9,} B  {encodings}")
@@ -0,0 +1,180 @@
+import base64
+import getpass
+import hashlib
+import hmac
+import os
+import secrets
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+# ---------------------------------------------------------------------------------------------------
+# Logins and signed session tokens.
+#
+# Users and their password hashes live in a credential file, one "user:hash"
+# line each, read once at startup. Checking a password (scrypt) is slow on
+# purpose, so it happens once at login: the browser then gets a session
+# token "<user>|<expiry>.<HMAC-SHA256 signature>" in a cookie, and later
+# requests only recompute one HMAC. Tokens seen recently are kept in a small
+# LRU cache so even that is skipped. Basic auth still works for scripts;
+# verified credentials are cached under their HMAC so a client resending the
+# same header is not run through scrypt each time.
+#
+# Signatures, password hashes and unknown users are all compared in constant
+# time (hmac.compare_digest, or a check against a dummy hash).
+# ---------------------------------------------------------------------------------------------------
+
+SESSION_COOKIE = "bill_session"
+VERIFIED_CACHE_SIZE = 1024
+
+# the old built-in login; seeds a new credential file so existing installs keep working
+DEFAULT_USER = "admin"
+DEFAULT_PASSWORD = "bill123"
+
+# hash of a random password nobody knows, checked for unknown users so they
+# take as long as a wrong password (precomputed: hashing one costs ~100 ms at startup)
+_DUMMY_HASH = (
+    "scrypt:32768:8:1$oWnPeCj51aD8iBd1$19c8e9997663165570bc7c0476e9be296993d48e4cd50291810dc0106690263"
+    "071f65cf7c5f9975069ceeeebd969312f8c74b85f8be2e10c1644078bd49f1406"
+)
+
+
+def _b64(data):
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _unb64(text):
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def load_credentials(path):
+    """{user: password hash} from a credential file of "user:hash" lines."""
+    users = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                user, _, hashed = line.partition(":")
+                users[user] = hashed
+    return users
+
+
+def save_credentials(path, users):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write("# user:password hash (python auth.py <user> to add or change one)\n")
+        for user, hashed in users.items():
+            f.write(f"{user}:{hashed}\n")
+    os.replace(tmp, path)
+
+
+def load_secret(path):
+    """Signing key from `path`, created on first use so sessions survive a restart."""
+    try:
+        with open(path, "rb") as f:
+            secret = f.read()
+        if len(secret) >= 32:
+            return secret
+    except FileNotFoundError:
+        pass
+    secret = secrets.token_bytes(32)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "wb") as f:
+        f.write(secret)
+    return secret
+
+
+class Authenticator:
+    def __init__(self, users, secret, ttl):
+        self.users = users
+        self.secret = secret
+        self.ttl = ttl
+        self.cache_hits = 0
+        self._verified = OrderedDict()     # token or credential digest -> (user, expires)
+        self._lock = threading.Lock()
+
+    # ---------------- Passwords ----------------------------------------------------------------
+    def check_password(self, user, password):
+        hashed = self.users.get(user)
+        ok = check_password_hash(hashed or _DUMMY_HASH, password)
+        return ok and hashed is not None
+
+    # ---------------- Tokens -------------------------------------------------------------------
+    def _sign(self, payload):
+        return _b64(hmac.new(self.secret, payload, hashlib.sha256).digest())
+
+    def issue(self, user, now=None):
+        """A session token for `user`, valid for `ttl` seconds."""
+        expires = int((now or time.time()) + self.ttl)
+        payload = f"{user}|{expires}".encode()
+        return f"{_b64(payload)}.{self._sign(payload)}"
+
+    def _remember(self, key, user, expires):
+        with self._lock:
+            self._verified[key] = (user, expires)
+            self._verified.move_to_end(key)
+            while len(self._verified) > VERIFIED_CACHE_SIZE:
+                self._verified.popitem(last=False)
+
+    def _recall(self, key, now):
+        with self._lock:
+            hit = self._verified.get(key)
+            if hit is None:
+                return None
+            if hit[1] <= now:
+                del self._verified[key]
+                return None
+            self._verified.move_to_end(key)
+            self.cache_hits += 1
+            return hit[0]
+
+    def verify(self, token, now=None):
+        """User the token was issued to, or None if it is forged, malformed or expired."""
+        if not token:
+            return None
+        now = now or time.time()
+        user = self._recall(token, now)
+        if user is not None:
+            return user
+
+        encoded, _, signature = token.partition(".")
+        try:
+            payload = _unb64(encoded)
+            user, _, expires = payload.decode().rpartition("|")
+            expires = int(expires)
+        except ValueError:
+            return None
+        if not hmac.compare_digest(signature, self._sign(payload)):
+            return None
+        if expires <= now or user not in self.users:
+            return None
+        self._remember(token, user, expires)
+        return user
+
+    def verify_basic(self, user, password, now=None):
+        """Basic-auth credentials, cached by HMAC so a repeated header skips the password hash."""
+        now = now or time.time()
+        key = "basic:" + self._sign(f"{user}\0{password}".encode())
+        if self._recall(key, now) is not None:
+            return user
+        if not self.check_password(user, password):
+            return None
+        self._remember(key, user, now + self.ttl)
+        return user
+
+
+if __name__ == "__main__":
+    here = os.path.dirname(os.path.abspath(__file__))
+    path = os.environ.get("AUTH_FILE") or os.path.join(here, "credentials.txt")
+    if len(sys.argv) != 2:
+        sys.exit("usage: python auth.py <user>   (adds the user or changes their password)")
+    users = load_credentials(path) if os.path.exists(path) else {}
+    password = getpass.getpass(f"Password for {sys.argv[1]}: ")
+    if password != getpass.getpass("Again: "):
+        sys.exit("Passwords do not match")
+    users[sys.argv[1]] = generate_password_hash(password)
+    save_credentials(path, users)
+    print(f"Saved {path}")
@@ -0,0 +1,142 @@
+import threading
+from bisect import bisect_left
+from calendar import monthrange
+from datetime import datetime, timedelta
+
+from booking_store import SyncedIndex
+
+# ---------------------------------------------------------------------------------------------------
+# In-memory hall availability index.
+#
+# Stays are kept as [checkin, checkout) intervals in minutes, in arrays sorted by
+# checkin. An overlap query for [s, e) only has to look at stays that start
+# before e and no earlier than s minus the longest stay on record, so it reads a
+# handful of entries whatever the size of the history. It follows the booking
+# store as a SyncedIndex, reading only each stay's dates, whether it is
+# confirmed, and the name and event shown in a clash warning.
+# ---------------------------------------------------------------------------------------------------
+
+FORM_DT = "%Y-%m-%dT%H:%M"
+
+
+def to_minutes(raw):
+    """Form datetime ("YYYY-MM-DDTHH:MM") as minutes since 0001-01-01, or None."""
+    if isinstance(raw, datetime):
+        dt = raw
+    else:
+        try:
+            dt = datetime.strptime(raw or "", FORM_DT)
+        except ValueError:
+            return None
+    return (dt.toordinal() * 24 + dt.hour) * 60 + dt.minute
+
+
+def _from_minutes(minutes):
+    days, rest = divmod(minutes, 24 * 60)
+    return datetime.fromordinal(days) + timedelta(minutes=rest)
+
+
+class Stay:
+    __slots__ = ("booking_id", "start", "end", "confirmed", "name", "event_type")
+
+    def __init__(self, booking_id, start, end, confirmed, name=None, event_type=None):
+        self.booking_id = booking_id
+        self.start = start
+        self.end = end
+        self.confirmed = confirmed
+        self.name = name
+        self.event_type = event_type
+
+    def to_dict(self):
+        return {
+            "id": self.booking_id,
+            "name": self.name,
+            "event_type": self.event_type,
+            "checkin": _from_minutes(self.start).strftime(FORM_DT),
+            "checkout": _from_minutes(self.end).strftime(FORM_DT),
+            "confirmed": self.confirmed,
+        }
+
+
+class AvailabilityIndex(SyncedIndex):
+    def __init__(self):
+        super().__init__()
+        self._starts = []     # sorted checkin minutes
+        self._stays = []      # Stay objects, same order as _starts
+        self._ids = set()     # every booking id seen, including removed ones
+        self._start_of = {}   # booking id -> checkin minute, for stays in the index
+        self._max_len = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._stays)
+
+    def add(self, booking_id, checkin, checkout, confirmed, name=None, event_type=None):
+        start, end = to_minutes(checkin), to_minutes(checkout)
+        if start is None or end is None or end <= start:
+            return False
+        with self._lock:
+            if booking_id in self._ids:
+                return False
+            i = bisect_left(self._starts, start)
+            self._starts.insert(i, start)
+            self._stays.insert(i, Stay(booking_id, start, end, confirmed, name, event_type))
+            self._ids.add(booking_id)
+            self._start_of[booking_id] = start
+            self._max_len = max(self._max_len, end - start)
+        return True
+
+    def remove(self, booking_id):
+        """Free the hall from a replaced or cancelled booking's stay; it is not added again later."""
+        with self._lock:
+            self._ids.add(booking_id)
+            start = self._start_of.pop(booking_id, None)
+            if start is None:
+                return False
+            i = bisect_left(self._starts, start)
+            while self._stays[i].booking_id != booking_id:
+                i += 1
+            del self._starts[i]
+            del self._stays[i]
+        return True
+
+    def _rows_since(self, store, after_id):
+        return store.stays_since(after_id)
+
+    def _take(self, rows):
+        for row in rows:
+            self.add(
+                row["id"], row["checkin"], row["checkout"],
+                (row["advance"] or 0) > 0, row["name"], row["event_type"],
+            )
+
+    def _drop(self, ids):
+        for booking_id in ids:
+            self.remove(booking_id)
+
+    def overlapping(self, start, end):
+        """Stays overlapping the minute range [start, end), in checkin order."""
+        with self._lock:
+            lo = bisect_left(self._starts, start - self._max_len)
+            hi = bisect_left(self._starts, end)
+            return [s for s in self._stays[lo:hi] if s.end > start]
+
+    def conflicts(self, checkin, checkout, exclude_ids=()):
+        start, end = to_minutes(checkin), to_minutes(checkout)
+        if start is None or end is None or end <= start:
+            return []
+        return [s for s in self.overlapping(start, end) if s.booking_id not in exclude_ids]
+
+    def month(self, year, month):
+        """{"YYYY-MM-DD": [stay, ...]} for every day of the month."""
+        first = datetime(year, month, 1)
+        ndays = monthrange(year, month)[1]
+        start = to_minutes(first)
+        days = {(first + timedelta(days=d)).strftime("%Y-%m-%d"): [] for d in range(ndays)}
+
+        for stay in self.overlapping(start, start + ndays * 24 * 60):
+            d0 = max(0, (stay.start - start) // (24 * 60))
+            d1 = min(ndays - 1, (stay.end - 1 - start) // (24 * 60))
+            for d in range(d0, d1 + 1):
+                days[(first + timedelta(days=d)).strftime("%Y-%m-%d")].append(stay)
+        return days
@@ -0,0 +1,176 @@
+import csv
+import io
+import json
+import multiprocessing
+import os
+import re
+import sys
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+import batch_worker
+from booking import Booking, BookingError
+
+# ---------------------------------------------------------------------------------------------------
+# Batch rendering: many bookings in, one ZIP of bills out.
+#
+# Bills are rendered in a process pool whose workers import ReportLab and warm
+# the style/page-2 caches once at start-up. The ZIP is written to the response
+# as each PDF completes, so the client starts receiving data straight away.
+#
+# Workers are spawned, never forked: forking the threaded server can copy a
+# lock some other thread holds. A spawned process normally re-imports the
+# parent's __main__ (app.py, with all its start-up), so workers are started
+# with batch_worker standing in as __main__ instead.
+# ---------------------------------------------------------------------------------------------------
+
+BATCH_WORKERS = int(os.environ.get("BATCH_WORKERS", os.cpu_count() or 1))
+BATCH_MAX_BOOKINGS = int(os.environ.get("BATCH_MAX_BOOKINGS", 500))
+
+
+class BatchError(ValueError):
+    """The uploaded batch could not be read."""
+
+
+# ---------------- Worker pool ----------------------------------------------------------------------
+_SPAWN = multiprocessing.get_context("spawn")
+_main_lock = threading.Lock()
+
+
+class _WorkerProcess(_SPAWN.Process):
+    def start(self):
+        # the child's start-up data (which module to import as __main__) is
+        # taken from sys.modules while the process is being launched
+        with _main_lock:
+            main = sys.modules["__main__"]
+            sys.modules["__main__"] = batch_worker
+            try:
+                super().start()
+            finally:
+                sys.modules["__main__"] = main
+
+
+class _WorkerContext(type(_SPAWN)):
+    Process = _WorkerProcess
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=BATCH_WORKERS, mp_context=_WorkerContext(), initializer=batch_worker.warm,
+            )
+        return _pool
+
+
+def _discard_pool(pool):
+    """Forget a broken pool (a worker died), so the next get_pool() starts a fresh one."""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _submit_all(bookings, engine, compact):
+    """Futures for every booking's bill, retrying once on a fresh pool if the current one is broken."""
+    for attempt in (1, 2):
+        pool = get_pool()
+        try:
+            return pool, {
+                pool.submit(batch_worker.render, booking, engine, compact): i
+                for i, booking in enumerate(bookings)
+            }
+        except BrokenProcessPool:
+            _discard_pool(pool)
+            if attempt == 2:
+                raise
+
+
+# ---------------- Input ----------------------------------------------------------------------------
+def parse_bookings(body, content_type, fields):
+    """
+    Read a JSON array or CSV of bookings, keeping only `fields`, and parse each
+    into a Booking. Any invalid booking rejects the whole batch.
+    """
+    text = body.decode("utf-8-sig") if isinstance(body, bytes) else body
+
+    if "json" in (content_type or "") or text.lstrip().startswith("["):
+        try:
+            rows = json.loads(text)
+        except ValueError as e:
+            raise BatchError(f"Invalid JSON: {e}")
+        if not isinstance(rows, list) or not all(isinstance(r, dict) for r in rows):
+            raise BatchError("JSON body must be an array of booking objects")
+    else:
+        rows = list(csv.DictReader(io.StringIO(text)))
+
+    if not rows:
+        raise BatchError("No bookings in batch")
+    if len(rows) > BATCH_MAX_BOOKINGS:
+        raise BatchError(f"Batch too large: {len(rows)} bookings (max {BATCH_MAX_BOOKINGS})")
+
+    bookings = []
+    for n, row in enumerate(rows, 1):
+        form = {f: (None if row.get(f) is None else str(row.get(f))) for f in fields}
+        try:
+            bookings.append(Booking.from_form(form))
+        except BookingError as e:
+            raise BatchError(f"Booking {n}: {e}")
+    return bookings
+
+
+# ---------------- Output ---------------------------------------------------------------------------
+class _ChunkSink(io.RawIOBase):
+    """Write-only, unseekable file that hands back whatever was written since the last drain."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self._chunks.append(bytes(b))
+        return len(b)
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _entry_name(i, booking):
+    name = re.sub(r"[^A-Za-z0-9]+", "_", booking.name).strip("_")
+    return f"{i + 1:03d}_{name or 'bill'}.pdf"
+
+
+def stream_zip(bookings, engine=None, compact=False, on_bill=None):
+    """
+    Yield ZIP bytes, adding each bill in completion order. `on_bill(booking,
+    pdf)` is called for each bill as it arrives, before it is added.
+    """
+    pool, futures = _submit_all(bookings, engine, compact)
+
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for future in as_completed(futures):
+            i = futures[future]
+            try:
+                pdf = future.result()
+                if on_bill is not None:
+                    on_bill(bookings[i], pdf)
+                zf.writestr(_entry_name(i, bookings[i]), pdf)
+            except Exception as e:
+                if isinstance(e, BrokenProcessPool):
+                    _discard_pool(pool)
+                zf.writestr(f"{i + 1:03d}_error.txt", f"Booking {i + 1} failed: {e}\n")
+            yield sink.drain()
+    yield sink.drain()
@@ -0,0 +1,19 @@
+# ---------------------------------------------------------------------------------------------------
+# Entry point for the batch pool's worker processes (see batch.py).
+#
+# Workers are spawned, and a spawned process starts by importing this module as
+# its __main__. Importing it must therefore do nothing: no config, no database,
+# no startup log. ReportLab and the bill caches are loaded by warm(), which the
+# pool runs once in each worker.
+# ---------------------------------------------------------------------------------------------------
+
+
+def warm():
+    import Generate_Bill
+    Generate_Bill.get_resources()
+    Generate_Bill.warm_page2_cache()
+
+
+def render(booking, engine, compact):
+    from Generate_Bill import generate_bill
+    return generate_bill(booking, engine=engine, compact=compact).getvalue()
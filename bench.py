@@ -0,0 +1,210 @@
+"""
+Microbenchmarks for generate_bill.
+
+    python bench.py                         # run every case, print a table
+    python bench.py --out bench.json        # also save the results
+    python bench.py --compare bench.json    # flag regressions against a saved run
+    python bench.py --compact               # time compact-mode renders instead
+
+Each case renders the same booking repeatedly in this process, so
+"per_core_per_sec" is single-core throughput. Peak memory is measured with
+tracemalloc on a separate render so it does not distort the timings. Every
+case also reports the size of its standard and its compact PDF. A baseline
+is only compared with a run of the same --engine and --compact.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+import Generate_Bill
+from Generate_Bill import generate_bill, BILL_ENGINES
+from booking import Booking
+
+BASE_BOOKING = {
+    "name": "Ravi Kumar",
+    "pax": "250",
+    "mobile": "9876543210",
+    "event_type": "Wedding Reception",
+    "checkin": "2026-11-20T10:00",
+    "checkout": "2026-11-22T10:00",
+    "function_rent": "45000",
+    "cleaning_charges": "3000",
+    "security_charges": "5000",
+    "electricity_charges": "12",
+    "advance": "0",
+    "advance_mode": "",
+    "remarks": "",
+    # fixed so every run renders identical bytes
+    "booked_at": "2026-10-01T12:00:00+05:30",
+}
+
+ROOMS = {
+    "room_needed": "on",
+    "double_rooms": "6",
+    "double_extra": "1",
+    "double_ac": "AC",
+    "double_rent": "1800",
+    "triple_rooms": "4",
+    "triple_extra_bed": "0",
+    "triple_ac": "Non-AC",
+    "triple_rent_per_room": "2400",
+}
+
+SHORT_REMARKS = "Stage decoration by customer."
+LONG_REMARKS = "\n".join(
+    f"{i}. Vendor arrangements, seating plan, catering timings and parking notes for the evening."
+    for i in range(1, 41)
+)
+
+# metrics where a higher number is worse
+REGRESSION_METRICS = ("p50_ms", "p95_ms", "p99_ms", "peak_kb", "pdf_bytes", "compact_bytes")
+# run settings a baseline must share to be compared, with the value assumed when
+# a baseline does not record it (runs from before --compact were standard renders)
+COMPARED_SETTINGS = {"engine": None, "compact": False}
+
+
+def cases():
+    for status, extra in (("quotation", {}), ("confirmed", {"advance": "20000", "advance_mode": "UPI"})):
+        for rooms in (False, True):
+            for remarks_name, remarks in (("short", SHORT_REMARKS), ("long", LONG_REMARKS)):
+                data = dict(BASE_BOOKING, **extra, remarks=remarks)
+                if rooms:
+                    data.update(ROOMS)
+                name = f"{status}/{'rooms' if rooms else 'no-rooms'}/{remarks_name}-remarks"
+                # parsed once, as /generate does, so only rendering is timed
+                yield name, Booking.from_form(data)
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    k = (len(ordered) - 1) * pct / 100.0
+    lo, hi = int(k), min(int(k) + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def run_case(booking, engine, iterations, warmup, compact=False):
+    for _ in range(warmup):
+        generate_bill(booking, engine=engine, compact=compact)
+
+    samples = []
+    size = 0
+    start = time.perf_counter()
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        size = len(generate_bill(booking, engine=engine, compact=compact).getvalue())
+        samples.append((time.perf_counter() - t0) * 1000)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    generate_bill(booking, engine=engine, compact=compact)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    other = len(generate_bill(booking, engine=engine, compact=not compact).getvalue())
+    standard, small = (other, size) if compact else (size, other)
+
+    return {
+        "iterations": iterations,
+        "p50_ms": round(percentile(samples, 50), 3),
+        "p95_ms": round(percentile(samples, 95), 3),
+        "p99_ms": round(percentile(samples, 99), 3),
+        "mean_ms": round(statistics.fmean(samples), 3),
+        "per_core_per_sec": round(iterations / elapsed, 2),
+        "peak_kb": round(peak / 1024, 1),
+        "pdf_bytes": standard,
+        "compact_bytes": small,
+    }
+
+
+def run(engine, iterations, warmup, only=None, compact=False):
+    results = {}
+    for name, booking in cases():
+        if only and only not in name:
+            continue
+        results[name] = run_case(booking, engine, iterations, warmup, compact)
+        r = results[name]
+        print(
+            f"{name:38} p50 {r['p50_ms']:8.2f} ms  p95 {r['p95_ms']:8.2f}  p99 {r['p99_ms']:8.2f}  "
+            f"{r['per_core_per_sec']:7.1f}/s/core  peak {r['peak_kb']:8.1f} KB  {r['pdf_bytes']:7d} B -> {r['compact_bytes']:6d} B compact"
+        )
+    return {
+        "engine": engine,
+        "compact": compact,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "cases": results,
+    }
+
+
+def compare(current, baseline, threshold):
+    """
+    Print a comparison and return the list of regressed (case, metric) pairs.
+    Raises ValueError if the baseline was run with other COMPARED_SETTINGS.
+    """
+    for setting, default in COMPARED_SETTINGS.items():
+        old, new = baseline.get(setting, default), current[setting]
+        if old != new:
+            raise ValueError(f"the baseline was run with {setting}={old}, this run with {setting}={new}")
+
+    regressions = []
+    print(f"\nCompared with baseline from {baseline.get('created', '?')} (threshold {threshold:.0%}):")
+    for name, cur in current["cases"].items():
+        base = baseline.get("cases", {}).get(name)
+        if not base:
+            print(f"  {name}: no baseline")
+            continue
+        for metric in REGRESSION_METRICS:
+            old, new = base.get(metric), cur.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if change > threshold:
+                regressions.append((name, metric))
+                print(f"  REGRESSION {name} {metric}: {old} -> {new} ({change:+.1%})")
+    if not regressions:
+        print("  no regressions")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--engine", choices=BILL_ENGINES, default=Generate_Bill.BILL_ENGINE)
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--case", help="only run cases whose name contains this text")
+    parser.add_argument("--compact", action="store_true", help="time compact-mode renders")
+    parser.add_argument("--out", help="write results as JSON to this file")
+    parser.add_argument("--compare", metavar="BASELINE", help="baseline JSON to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="relative increase that counts as a regression (default 0.10)")
+    args = parser.parse_args(argv)
+
+    results = run(args.engine, args.iterations, args.warmup, args.case, args.compact)
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nWrote {args.out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        try:
+            regressions = compare(results, baseline, args.threshold)
+        except ValueError as e:
+            print(f"\nNot comparing with {args.compare}: {e}")
+            return 2
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+import mmap
+import os
+import re
+import struct
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:      # Windows
+    fcntl = None
+    import msvcrt
+
+# ---------------------------------------------------------------------------------------------------
+# Append-only archive of issued bills, addressed by bill number.
+#
+# PDFs are appended to segment files (segment-000001.bin, ...); a segment is
+# closed once it reaches `segment_bytes` and never written again. index.bin
+# holds one fixed-size record per bill number, (segment, offset, length) at
+# byte (number - 1) * 16, so finding a bill is one 16-byte read at a computed
+# offset and reading it is a slice of the memory-mapped segment: the same
+# cost for the first bill as for the millionth. A record of all zeros means
+# "not archived".
+#
+# Appends from every worker process are serialised by an OS lock on
+# archive.lock. The PDF is written and flushed to disk before its index
+# record, so the index never points at bytes that are not there; a bill is
+# archived once and later puts for its number are ignored.
+# ---------------------------------------------------------------------------------------------------
+
+ARCHIVE_SEGMENT_BYTES = 256 * 1024 * 1024
+
+_RECORD = struct.Struct("<IQI")     # segment, offset, length
+_SEGMENT = re.compile(r"^segment-(\d{6})\.bin$")
+
+
+@contextmanager
+def _exclusive(path):
+    """Hold an exclusive lock on `path` (created if missing) across processes."""
+    with open(path, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _write_synced(f, data):
+    f.write(data)
+    f.flush()
+    os.fsync(f.fileno())
+
+
+class BillArchive:
+    def __init__(self, directory, segment_bytes=ARCHIVE_SEGMENT_BYTES):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        os.makedirs(directory, exist_ok=True)
+        self._index_path = os.path.join(directory, "index.bin")
+        self._lock_path = os.path.join(directory, "archive.lock")
+        self._segment = max(self._segments(), default=1)
+        self._maps = {}             # segment -> read-only mmap of it
+        self._lock = threading.Lock()
+
+    def _segments(self):
+        return [int(m.group(1)) for m in map(_SEGMENT.match, os.listdir(self.directory)) if m]
+
+    def _segment_path(self, segment):
+        return os.path.join(self.directory, f"segment-{segment:06d}.bin")
+
+    # ---------------- Index --------------------------------------------------------------------
+    def _record(self, number):
+        """(segment, offset, length) for `number`, or None if it is not archived."""
+        if number < 1:
+            return None
+        try:
+            with open(self._index_path, "rb") as f:
+                f.seek((number - 1) * _RECORD.size)
+                raw = f.read(_RECORD.size)
+        except FileNotFoundError:
+            return None
+        if len(raw) < _RECORD.size:
+            return None
+        segment, offset, length = _RECORD.unpack(raw)
+        return (segment, offset, length) if length else None
+
+    def __contains__(self, number):
+        return self._record(number) is not None
+
+    # ---------------- Writes -------------------------------------------------------------------
+    def put(self, number, pdf):
+        """Archive `pdf` as bill `number`. Returns False if that number was already archived."""
+        if number < 1:
+            raise ValueError(f"bill numbers start at 1, not {number}")
+        with self._lock, _exclusive(self._lock_path):
+            if self._record(number) is not None:
+                return False
+
+            # another process may have started a newer segment since we last looked
+            while os.path.exists(self._segment_path(self._segment + 1)):
+                self._segment += 1
+            path = self._segment_path(self._segment)
+            size = os.path.getsize(path) if os.path.exists(path) else 0
+            if size and size + len(pdf) > self.segment_bytes:
+                self._segment += 1
+                path, size = self._segment_path(self._segment), 0
+
+            with open(path, "ab") as f:
+                offset = f.seek(0, os.SEEK_END)
+                _write_synced(f, pdf)
+
+            mode = "r+b" if os.path.exists(self._index_path) else "w+b"
+            with open(self._index_path, mode) as f:
+                f.seek((number - 1) * _RECORD.size)
+                _write_synced(f, _RECORD.pack(self._segment, offset, len(pdf)))
+        return True
+
+    # ---------------- Reads --------------------------------------------------------------------
+    def _map(self, segment, end):
+        """A read-only map of `segment` covering at least its first `end` bytes."""
+        with self._lock:
+            mapped = self._maps.get(segment)
+            if mapped is None or len(mapped) < end:
+                # the last segment grows; map it again rather than resizing, since
+                # views of the old map may still be in use (it closes once they are gone)
+                with open(self._segment_path(segment), "rb") as f:
+                    mapped = self._maps[segment] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            return mapped
+
+    def get(self, number):
+        """Bill `number` as a memoryview of its segment, or None if it is not archived."""
+        record = self._record(number)
+        if record is None:
+            return None
+        segment, offset, length = record
+        return memoryview(self._map(segment, offset + length))[offset:offset + length]
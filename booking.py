@@ -0,0 +1,187 @@
+import re
+from datetime import datetime
+from decimal import Decimal
+
+# ---------------------------------------------------------------------------------------------------
+# Booking model.
+#
+# The billForm fields are parsed and checked once, when the request comes in:
+# counts become ints, money becomes Decimal and the stay becomes two datetimes.
+# Input that would only produce a wrong bill (checkout before checkin, negative
+# rooms, text in a money field, amounts no hall would charge) is refused with
+# BookingError before any PDF work starts. The renderer and pricing.compute_totals read the parsed attributes; the
+# raw strings are kept in `form` for the cache key and the booking store.
+# ---------------------------------------------------------------------------------------------------
+
+# billForm fields (templates/index.html), in form order
+FIELDS = (
+    "name", "pax", "mobile", "event_type",
+
+    "checkin", "checkout",
+
+    "room_needed",
+
+    "double_rooms", "double_extra", "double_ac", "double_rent",
+
+    "triple_rooms", "triple_extra_bed", "triple_ac", "triple_rent_per_room",
+
+    "function_rent", "cleaning_charges", "security_charges", "electricity_charges",
+
+    "advance", "advance_mode",
+
+    "remarks",
+)
+
+FORM_DT = "%Y-%m-%dT%H:%M"
+
+TEXT_FIELDS = ("name", "mobile", "event_type", "double_ac", "triple_ac", "advance_mode", "remarks")
+COUNT_FIELDS = ("pax", "double_rooms", "double_extra", "triple_rooms", "triple_extra_bed")
+MONEY_FIELDS = (
+    "double_rent", "triple_rent_per_room",
+    "function_rent", "cleaning_charges", "security_charges", "electricity_charges", "advance",
+)
+ROOM_FIELDS = (
+    "double_rooms", "double_extra", "double_ac", "double_rent",
+    "triple_rooms", "triple_extra_bed", "triple_ac", "triple_rent_per_room",
+)
+
+ZERO = Decimal(0)
+
+# largest count and amount accepted in any one field; far above any real bill,
+# and small enough that totals stay short on the PDF and fit int64 paise
+MAX_COUNT = 100_000
+MAX_AMOUNT = Decimal(10) ** 9
+
+# plain rupees with at most two decimal places: no exponents, inf or nan
+_AMOUNT = re.compile(r"-?(\d+(\.\d{0,2})?|\.\d{1,2})", re.ASCII)
+
+
+class BookingError(ValueError):
+    """The booking form is invalid. `errors` maps field name to message."""
+
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__("; ".join(f"{field}: {msg}" for field, msg in errors.items()))
+
+
+def _text(raw):
+    return "" if raw is None else str(raw).strip()
+
+
+def _count(raw):
+    raw = _text(raw)
+    if not raw:
+        return None
+    try:
+        value = int(raw)
+    except ValueError:
+        raise ValueError("must be a whole number")
+    if value < 0:
+        raise ValueError("cannot be negative")
+    if value > MAX_COUNT:
+        raise ValueError(f"cannot be more than {MAX_COUNT}")
+    return value
+
+
+def _money(raw):
+    raw = _text(raw)
+    if not raw:
+        return None
+    if not _AMOUNT.fullmatch(raw):
+        raise ValueError("must be an amount in rupees with at most 2 decimal places")
+    value = Decimal(raw)
+    if value < 0:
+        raise ValueError("cannot be negative")
+    if value > MAX_AMOUNT:
+        raise ValueError(f"cannot be more than {MAX_AMOUNT}")
+    return value
+
+
+def _when(raw):
+    raw = _text(raw)
+    if not raw:
+        raise ValueError("is required")
+    try:
+        # exactly FORM_DT; fromisoformat is much cheaper than strptime
+        if len(raw) != 16 or raw[10] != "T":
+            raise ValueError
+        return datetime.fromisoformat(raw)
+    except ValueError:
+        raise ValueError("must be a date and time (YYYY-MM-DDTHH:MM)")
+
+
+def _booked_at(raw):
+    if raw is None or isinstance(raw, datetime):
+        return raw
+    try:
+        return datetime.fromisoformat(str(raw))
+    except ValueError:
+        return None
+
+
+class Booking:
+    __slots__ = FIELDS + ("booked_at", "bill_no", "form")
+
+    @classmethod
+    def from_form(cls, form, strict=True):
+        """
+        Parse a billForm submission (any mapping of field name to string).
+        Raises BookingError listing every invalid field. With strict=False the
+        checks that do not change the price (room type filled in, advance
+        payment mode) are skipped, for quoting a form that is still being filled.
+        """
+        self = cls()
+        self.form = {f: form.get(f) for f in FIELDS}
+        self.booked_at = _booked_at(form.get("booked_at"))
+        self.bill_no = None     # given by the booking store when the booking is saved
+        self.room_needed = _text(form.get("room_needed")) == "on"
+
+        errors = {}
+
+        def parse(fields, convert):
+            for field in fields:
+                try:
+                    setattr(self, field, convert(form.get(field)))
+                except ValueError as e:
+                    errors[field] = str(e)
+                    setattr(self, field, None)
+
+        parse(TEXT_FIELDS, _text)
+        parse(COUNT_FIELDS, _count)
+        parse(MONEY_FIELDS, _money)
+        parse(("checkin", "checkout"), _when)
+
+        if not self.room_needed:
+            # unticked room fields are not on the bill
+            for field in ROOM_FIELDS:
+                errors.pop(field, None)
+                setattr(self, field, "" if field in TEXT_FIELDS else None)
+        elif strict and not (
+            (self.double_rooms and self.double_rent) or (self.triple_rooms and self.triple_rent_per_room)
+        ):
+            errors.setdefault("room_needed", "fill at least one room type with rooms and rent")
+
+        if self.checkin and self.checkout and self.checkout <= self.checkin:
+            errors["checkout"] = "must be after checkin"
+
+        if self.advance is None:
+            self.advance = ZERO
+        if strict and self.advance > 0 and not self.advance_mode:
+            errors["advance_mode"] = "is required when an advance is paid"
+
+        if errors:
+            raise BookingError(errors)
+        return self
+
+    @property
+    def confirmed(self):
+        """An advance has been paid, so the bill is a booking rather than a quotation."""
+        return self.advance > 0
+
+    @property
+    def days(self):
+        return max(1, (self.checkout - self.checkin).days)
+
+    def as_form(self):
+        """The submitted fields plus booked_at, as stored with the booking."""
+        return dict(self.form, booked_at=self.booked_at)
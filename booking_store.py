@@ -0,0 +1,319 @@
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from decimal import Decimal
+
+# ---------------------------------------------------------------------------------------------------
+# Persistent booking store (embedded SQLite, WAL mode).
+#
+# Every booking that gets a bill is saved with its form fields and the totals
+# printed on it, so a bill can be re-issued later without retyping the form.
+# WAL lets the server's worker processes read while one of them writes.
+# Each booking gets the next bill number as it is inserted: the number is
+# worked out inside the INSERT, and SQLite runs one write at a time across
+# all processes, so numbers have no gaps and no duplicates.
+#
+# A booking is corrected by saving the new version with the id of the one it
+# replaces: the new row gets its own bill number and, in the same transaction,
+# the old row is voided (cancelling a booking voids it with no replacement).
+# Voided rows are kept, so their bills can still be looked up, but are left
+# out of everything that counts bookings. Each void gets the next void_seq the
+# same way bills get numbers, so in-memory indexes can pick up voids made by
+# any process with voided_since().
+# Connections are per thread and per process; sqlite3 connections must not
+# cross either boundary.
+# ---------------------------------------------------------------------------------------------------
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bookings (
+    id             INTEGER PRIMARY KEY,
+    booking_key    TEXT    NOT NULL UNIQUE,
+    created_at     TEXT    NOT NULL,
+    booked_at      TEXT    NOT NULL,
+    name           TEXT,
+    mobile         TEXT,
+    event_type     TEXT,
+    checkin        TEXT,
+    checkout       TEXT,
+    advance_mode   TEXT,
+    days           INTEGER,
+    room_total     REAL,
+    per_day_total  REAL,
+    total_rent     REAL,
+    advance        REAL,
+    balance        REAL,
+    data           TEXT    NOT NULL,
+    bill_no        INTEGER,
+    replaced_by    INTEGER,
+    voided_at      TEXT,
+    void_seq       INTEGER
+);
+CREATE INDEX IF NOT EXISTS bookings_stay ON bookings (checkin, checkout);
+CREATE INDEX IF NOT EXISTS bookings_mobile ON bookings (mobile);
+CREATE INDEX IF NOT EXISTS bookings_created ON bookings (created_at);
+"""
+
+# evaluated inside the INSERT, under SQLite's write lock
+NEXT_BILL_NO = "(SELECT COALESCE(MAX(bill_no), 0) + 1 FROM bookings)"
+NEXT_VOID_SEQ = "(SELECT COALESCE(MAX(void_seq), 0) + 1 FROM bookings)"
+
+# columns added since the first schema, for databases created before them
+ADDED_COLUMNS = {"bill_no": "INTEGER", "replaced_by": "INTEGER", "voided_at": "TEXT", "void_seq": "INTEGER"}
+
+TOTAL_COLUMNS = ("days", "room_total", "per_day_total", "total_rent", "advance", "balance")
+
+SUMMARY_COLUMNS = (
+    "id", "bill_no", "created_at", "booked_at", "name", "mobile", "event_type",
+    "checkin", "checkout", "advance_mode",
+) + TOTAL_COLUMNS + ("replaced_by", "voided_at")
+
+ACTIVE = "voided_at IS NULL"
+
+
+class StaleBooking(Exception):
+    """The booking being corrected or cancelled was already replaced or cancelled."""
+
+
+def _iso(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _number(value):
+    # sqlite3 has no Decimal binding; the exact amounts stay in the data column
+    return float(value) if isinstance(value, Decimal) else value
+
+
+class BookingStore:
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+            _add_columns(conn)
+            _number_bookings(conn)
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        # IMMEDIATE: a write transaction takes the write lock before its first read,
+        # so the bill number is read and used under the same lock
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level="IMMEDIATE")
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    # ---------------- Writes -----------------------------------------------------------------------
+    def save(self, data, booking_key, totals, replaces=None):
+        """
+        Store a booking and return {"id", "booked_at", "bill_no"} for it. A
+        booking already stored under the same key is left as it is and its
+        values returned. With `replaces`, that booking is voided in favour of
+        this one; StaleBooking if it is no longer active.
+        """
+        fields = {k: v for k, v in data.items() if k != "booked_at"}
+        row = {
+            "booking_key": booking_key,
+            # UTC so created_at strings sort chronologically
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "booked_at": _iso(data.get("booked_at")) or datetime.now(timezone.utc).isoformat(),
+            "name": data.get("name"),
+            "mobile": data.get("mobile"),
+            "event_type": data.get("event_type"),
+            "checkin": data.get("checkin"),
+            "checkout": data.get("checkout"),
+            "advance_mode": data.get("advance_mode"),
+            "data": json.dumps(fields, sort_keys=True),
+        }
+        for col in TOTAL_COLUMNS:
+            row[col] = _number(totals.get(col))
+
+        cols = ", ".join(row)
+        marks = ", ".join(f":{c}" for c in row)
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                f"INSERT INTO bookings ({cols}, bill_no) VALUES ({marks}, {NEXT_BILL_NO}) "
+                "ON CONFLICT(booking_key) DO NOTHING",
+                row,
+            )
+            found = conn.execute(
+                "SELECT id, booked_at, bill_no FROM bookings WHERE booking_key = ?", (booking_key,)
+            ).fetchone()
+            if replaces is not None and replaces != found["id"]:
+                _void(conn, replaces, found["id"])
+        return dict(found)
+
+    def void(self, booking_id):
+        """Cancel a booking. StaleBooking if it is unknown or already voided."""
+        conn = self._connect()
+        with conn:
+            _void(conn, booking_id, None)
+
+    # ---------------- Reads ------------------------------------------------------------------------
+    def get(self, booking_id):
+        row = self._connect().execute("SELECT * FROM bookings WHERE id = ?", (booking_id,)).fetchone()
+        return _booking(row)
+
+    def find_by_key(self, booking_key):
+        row = self._connect().execute(
+            "SELECT * FROM bookings WHERE booking_key = ?", (booking_key,)
+        ).fetchone()
+        return _booking(row)
+
+    def get_by_bill_no(self, bill_no):
+        row = self._connect().execute("SELECT * FROM bookings WHERE bill_no = ?", (bill_no,)).fetchone()
+        return _booking(row)
+
+    def stays_since(self, after_id):
+        """(id, checkin, checkout, advance, name, event_type) for active bookings with id > after_id."""
+        return self._connect().execute(
+            "SELECT id, checkin, checkout, advance, name, event_type FROM bookings "
+            f"WHERE id > ? AND {ACTIVE} ORDER BY id",
+            (after_id,),
+        ).fetchall()
+
+    def bookings_since(self, after_id):
+        """Full active bookings (as get() returns them) with id > after_id, oldest first."""
+        rows = self._connect().execute(
+            f"SELECT * FROM bookings WHERE id > ? AND {ACTIVE} ORDER BY id", (after_id,)
+        ).fetchall()
+        return [_booking(r) for r in rows]
+
+    def voided_since(self, after_seq):
+        """(id, void_seq) of bookings voided after void_seq `after_seq`, in the order they were voided."""
+        return self._connect().execute(
+            "SELECT id, void_seq FROM bookings WHERE void_seq > ? ORDER BY void_seq", (after_seq,)
+        ).fetchall()
+
+    def search(self, start=None, end=None, mobile=None, created_from=None, created_to=None, limit=100,
+               voided=False):
+        """
+        Booking summaries, newest first. `start`/`end` select stays overlapping
+        that window (same "YYYY-MM-DDTHH:MM" format as the form). Replaced and
+        cancelled bookings are only included with `voided`.
+        """
+        where, args = _filters(start, end, mobile, created_from, created_to, voided)
+        sql = f"SELECT {', '.join(SUMMARY_COLUMNS)} FROM bookings{where} ORDER BY created_at DESC LIMIT ?"
+        return [dict(r) for r in self._connect().execute(sql, args + [limit])]
+
+    def iter_bookings(self, start=None, end=None, mobile=None, created_from=None, created_to=None,
+                      voided=False, batch_size=500):
+        """
+        Full bookings matching the same filters as search(), in checkin order,
+        read `batch_size` rows at a time so memory does not grow with the range.
+        """
+        where, args = _filters(start, end, mobile, created_from, created_to, voided)
+        cursor = self._connect().execute(f"SELECT * FROM bookings{where} ORDER BY checkin, id", args)
+        try:
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    return
+                for row in rows:
+                    yield _booking(row)
+        finally:
+            cursor.close()
+
+
+class SyncedIndex:
+    """
+    Base for the in-memory views of the store (availability, customers,
+    reports). sync() reads only what changed since the last call: active rows
+    with a higher id, then voids with a higher void_seq. Both are assigned in
+    write order across processes, so this also picks up bookings saved,
+    corrected or cancelled by other workers.
+
+    Subclasses implement _take(rows), consuming the rows in order, and
+    _drop(ids); _rows_since() picks which columns are read.
+    """
+
+    def __init__(self):
+        self._last_id = 0
+        self._last_void = 0
+
+    def _rows_since(self, store, after_id):
+        return store.bookings_since(after_id)
+
+    def _new_rows(self, store):
+        for row in self._rows_since(store, self._last_id):
+            yield row
+            # only once _take is done with the row, so a row it fails on is read again
+            self._last_id = row["id"]
+
+    def sync(self, store):
+        """Take in the bookings saved to `store` since the last sync, then drop those voided since."""
+        self._take(self._new_rows(store))
+        voided = store.voided_since(self._last_void)
+        if voided:
+            self._drop([row["id"] for row in voided])
+            self._last_void = voided[-1]["void_seq"]
+
+
+def _add_columns(conn):
+    """Bring a database created with an older schema up to date."""
+    present = {r["name"] for r in conn.execute("PRAGMA table_info(bookings)")}
+    for name, kind in ADDED_COLUMNS.items():
+        if name not in present:
+            conn.execute(f"ALTER TABLE bookings ADD COLUMN {name} {kind}")
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS bookings_void_seq ON bookings (void_seq)")
+
+
+def _number_bookings(conn):
+    """Number the bookings of an older database in id order."""
+    last = conn.execute("SELECT COALESCE(MAX(bill_no), 0) FROM bookings").fetchone()[0]
+    unnumbered = conn.execute("SELECT id FROM bookings WHERE bill_no IS NULL ORDER BY id").fetchall()
+    conn.executemany(
+        "UPDATE bookings SET bill_no = ? WHERE id = ?",
+        [(last + n, r["id"]) for n, r in enumerate(unnumbered, 1)],
+    )
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS bookings_bill_no ON bookings (bill_no)")
+
+
+def _void(conn, booking_id, replaced_by):
+    # the content key is freed (made unique to this row) so the same booking can be stored again
+    voided = conn.execute(
+        "UPDATE bookings SET replaced_by = ?, voided_at = ?, booking_key = booking_key || '~' || id, "
+        f"void_seq = {NEXT_VOID_SEQ} WHERE id = ? AND {ACTIVE}",
+        (replaced_by, datetime.now(timezone.utc).isoformat(), booking_id),
+    )
+    if voided.rowcount != 1:
+        raise StaleBooking(booking_id)
+
+
+def _filters(start, end, mobile, created_from, created_to, voided=False):
+    where, args = [], []
+    if not voided:
+        where.append(ACTIVE)
+    if start:
+        where.append("checkout > ?")
+        args.append(start)
+    if end:
+        where.append("checkin < ?")
+        args.append(end)
+    if mobile:
+        where.append("mobile = ?")
+        args.append(mobile)
+    if created_from:
+        where.append("created_at >= ?")
+        args.append(created_from)
+    if created_to:
+        where.append("created_at < ?")
+        args.append(created_to)
+    return (" WHERE " + " AND ".join(where) if where else ""), args
+
+
+def _booking(row):
+    """A stored row as {"id", ..., "data": form fields with booked_at restored}."""
+    if row is None:
+        return None
+    booking = dict(row)
+    data = json.loads(booking.pop("data"))
+    data["booked_at"] = booking["booked_at"]
+    booking["data"] = data
+    return booking
@@ -0,0 +1,170 @@
+import re
+import threading
+from bisect import bisect_left, insort
+
+from booking import FIELDS
+from booking_store import SyncedIndex
+
+# ---------------------------------------------------------------------------------------------------
+# In-memory customer lookup for the form's name and mobile autocomplete.
+#
+# A customer is a mobile number; each keeps the values of their latest booking
+# so the form can be filled in from it. Lookup keys are the mobile's digits
+# and every word of the name (so "varma" finds "Srinivas Varma"), lower-cased,
+# held in one sorted list of (key, mobile) pairs. A prefix query is a bisect
+# to the first key >= the prefix and a walk over the keys that start with it,
+# so it reads only the matches whatever the number of customers. The index
+# follows the booking store as a SyncedIndex. A correction moves the customer to
+# the corrected values only if it is their latest booking, and a customer whose
+# bookings have all been voided is dropped.
+# ---------------------------------------------------------------------------------------------------
+
+# values carried over from a customer's last booking; the stay, payment and
+# remarks belong to that booking only
+PREFILL_FIELDS = tuple(
+    f for f in FIELDS if f not in ("checkin", "checkout", "advance", "advance_mode", "remarks")
+)
+
+# matches looked at per query before ranking by recency
+MAX_SCAN = 200
+
+_WORD = re.compile(r"\w+")
+_PHONE = re.compile(r"[\d\s+-]+")
+
+
+def _digits(mobile):
+    return re.sub(r"\D", "", mobile or "")
+
+
+class Customer:
+    __slots__ = ("mobile", "name", "booking_id", "booked_at", "bookings", "prefill")
+
+    def __init__(self, mobile):
+        self.mobile = mobile
+        self.name = None
+        self.booking_id = 0
+        self.booked_at = None
+        self.bookings = 0
+        self.prefill = {}
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "mobile": self.mobile,
+            "bookings": self.bookings,
+            "last_booking_id": self.booking_id,
+            "last_booked_at": self.booked_at,
+            "prefill": self.prefill,
+        }
+
+
+class CustomerIndex(SyncedIndex):
+    def __init__(self):
+        super().__init__()
+        self._keys = []           # sorted (key, mobile digits)
+        self._customers = {}      # mobile digits -> Customer
+        self._mobile_of = {}      # booking id -> mobile digits, for bookings counted
+        self._seen = set()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._customers)
+
+    def _keys_for(self, customer):
+        keys = {_digits(customer.mobile)}
+        keys.update(w.lower() for w in _WORD.findall(customer.name or ""))
+        keys.discard("")
+        return keys
+
+    def add(self, booking_id, data, booked_at=None):
+        """Record a stored booking (its form fields) against its customer."""
+        mobile = _digits(data.get("mobile"))
+        if not mobile:
+            return False
+        with self._lock:
+            if booking_id in self._seen:
+                return False
+            self._seen.add(booking_id)
+            self._mobile_of[booking_id] = mobile
+
+            customer = self._customers.get(mobile)
+            if customer is None:
+                customer = self._customers[mobile] = Customer(mobile)
+            customer.bookings += 1
+            if booking_id < customer.booking_id:
+                return True     # an older booking arriving late; keep the newer values
+
+            old_keys = self._keys_for(customer) if customer.name is not None else set()
+            customer.name = (data.get("name") or "").strip()
+            customer.mobile = (data.get("mobile") or "").strip()
+            customer.booking_id = booking_id
+            customer.booked_at = booked_at or data.get("booked_at")
+            customer.prefill = {f: data.get(f) for f in PREFILL_FIELDS if data.get(f) not in (None, "")}
+
+            # a changed name moves the customer to its new words
+            new_keys = self._keys_for(customer)
+            for key in old_keys - new_keys:
+                i = bisect_left(self._keys, (key, mobile))
+                del self._keys[i]
+            for key in new_keys - old_keys:
+                insort(self._keys, (key, mobile))
+        return True
+
+    def remove(self, booking_id):
+        """
+        Stop counting a replaced or cancelled booking; it is not added again
+        later. The customer keeps the values it had unless no bookings are left.
+        """
+        with self._lock:
+            self._seen.add(booking_id)
+            mobile = self._mobile_of.pop(booking_id, None)
+            if mobile is None:
+                return False
+            customer = self._customers[mobile]
+            customer.bookings -= 1
+            if not customer.bookings:
+                for key in self._keys_for(customer):
+                    del self._keys[bisect_left(self._keys, (key, mobile))]
+                del self._customers[mobile]
+        return True
+
+    def _take(self, rows):
+        for stored in rows:
+            self.add(stored["id"], stored["data"], stored["booked_at"])
+
+    def _drop(self, ids):
+        for booking_id in ids:
+            self.remove(booking_id)
+
+    def search(self, prefix, limit=8):
+        """
+        Customers whose mobile, or a word of whose name, starts with `prefix`,
+        most recent booking first. Every word of a multi-word prefix must match.
+        """
+        prefix = prefix.strip().lower()
+        if _PHONE.fullmatch(prefix):
+            words = [_digits(prefix)]    # "+91 98480-" is looked up as its digits
+        else:
+            words = _WORD.findall(prefix)
+        if not words or not words[0]:
+            return []
+        scan = max(words, key=len)
+
+        with self._lock:
+            found = {}
+            i = bisect_left(self._keys, (scan,))
+            while i < len(self._keys) and len(found) < MAX_SCAN:
+                key, mobile = self._keys[i]
+                if not key.startswith(scan):
+                    break
+                found[mobile] = self._customers[mobile]
+                i += 1
+            if len(words) > 1:
+                found = {m: c for m, c in found.items() if _matches(c, words)}
+            ranked = sorted(found.values(), key=lambda c: c.booking_id, reverse=True)[:limit]
+            return [c.to_dict() for c in ranked]
+
+
+def _matches(customer, words):
+    keys = [w.lower() for w in _WORD.findall(customer.name or "")] + [_digits(customer.mobile)]
+    return all(any(k.startswith(w) for k in keys) for w in words)
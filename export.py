@@ -0,0 +1,82 @@
+import csv
+import io
+
+from booking import Booking, BookingError
+from pricing import compute_totals, day_charges, money
+
+# ---------------------------------------------------------------------------------------------------
+# CSV export of stored bookings.
+#
+# One row per booking with the payment lines printed on its bill, worked out
+# by the same pricing engine. Rows are written to a small buffer that is
+# handed out every EXPORT_CHUNK_ROWS rows, so with a streaming response and a
+# cursor-backed row source the memory used is the same for 10 rows or 100,000.
+# ---------------------------------------------------------------------------------------------------
+
+EXPORT_CHUNK_ROWS = 200
+
+# Payment Summary lines, by the label day_charges() gives them
+LINE_COLUMNS = {
+    "Room Rent": "room_rent",
+    "Function Hall Rent": "function_hall_rent",
+    "Cleaning": "cleaning",
+    "Security": "security",
+}
+
+COLUMNS = (
+    "id", "bill_no", "created_at", "booked_at", "status", "replaced_by",
+    "name", "pax", "mobile", "event_type", "checkin", "checkout",
+    "double_rooms", "double_rent", "triple_rooms", "triple_rent_per_room",
+    *LINE_COLUMNS.values(),
+    "per_day_total", "days", "total_rent", "advance", "advance_mode", "balance",
+    "electricity_per_unit", "remarks",
+)
+
+
+def _row(stored):
+    data = stored["data"]
+    row = {c: data.get(c) for c in COLUMNS if c in data}
+    row.update(
+        id=stored["id"], bill_no=stored["bill_no"],
+        created_at=stored["created_at"], booked_at=stored["booked_at"],
+        replaced_by=stored["replaced_by"],
+    )
+
+    try:
+        booking = Booking.from_form(data, strict=False)
+    except BookingError:
+        # saved before the form was validated on the server: fields only, no totals
+        row["status"] = "invalid"
+        return row
+
+    totals = compute_totals(booking)
+    if stored["voided_at"]:
+        row["status"] = "replaced" if stored["replaced_by"] else "cancelled"
+    else:
+        row["status"] = "booking" if booking.confirmed else "quotation"
+    for label, amount in day_charges(booking, totals):
+        row[LINE_COLUMNS[label]] = money(amount)
+    row.update(
+        per_day_total=money(totals["per_day_total"]),
+        days=totals["days"],
+        total_rent=money(totals["total_rent"]),
+        advance=money(totals["advance"]),
+        balance=money(totals["balance"]),
+        electricity_per_unit=money(totals["electricity_per_unit"]),
+    )
+    return row
+
+
+def stream_csv(bookings):
+    """Yield CSV text for `bookings` (an iterable of stored bookings), header first."""
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=COLUMNS, extrasaction="ignore")
+    writer.writeheader()
+
+    for n, stored in enumerate(bookings, 1):
+        writer.writerow(_row(stored))
+        if n % EXPORT_CHUNK_ROWS == 0:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue()
@@ -0,0 +1,251 @@
+from reportlab.lib.pagesizes import A4
+from reportlab.lib import colors
+from reportlab.lib.utils import simpleSplit
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.pdfgen.canvas import Canvas
+
+import metrics
+
+from Generate_Bill import (
+    PAGE_MARGINS, GUEST_COL_WIDTHS, ROOM_COL_WIDTHS, PAY_COL_WIDTHS,
+    draw_header_page1, draw_footer_and_signatures_page2, get_page2, page_compression,
+)
+
+# ---------------------------------------------------------------------------------------------------
+# Direct-canvas renderer for the fixed bill layout.
+#
+# Page 1 always has the same shape (timestamp, guest table, optional room table,
+# payment table, remarks), so instead of running it through platypus every
+# coordinate is worked out here with the same rules SimpleDocTemplate's frame
+# and Table use: 6pt frame padding, 18pt single-line table rows, collapsed
+# paragraph spacing. render_canvas() returns False when the content does not
+# fit that shape (remarks that overflow page 1, need markup handling or hold a
+# word too long for a line, or a table cell with a line break, which platypus
+# grows the row for) and the caller falls back to platypus.
+# ---------------------------------------------------------------------------------------------------
+
+W, H = A4
+
+FRAME_PADDING = 6
+DOC_WIDTH = W - PAGE_MARGINS["leftMargin"] - PAGE_MARGINS["rightMargin"]
+FRAME_X = PAGE_MARGINS["leftMargin"] + FRAME_PADDING
+FRAME_WIDTH = DOC_WIDTH - 2 * FRAME_PADDING
+FRAME_TOP = H - PAGE_MARGINS["topMargin"] - FRAME_PADDING
+FRAME_BOTTOM = PAGE_MARGINS["bottomMargin"] + FRAME_PADDING
+
+# tables are doc.width wide, i.e. wider than the padded frame, and centred on it
+TABLE_X = FRAME_X + (FRAME_WIDTH - DOC_WIDTH) / 2
+
+# ReportLab Table defaults: leading 12, padding 6 left/right and 3 top/bottom
+CELL_LEADING = 12
+CELL_PAD_X = 6
+CELL_PAD_Y = 3
+ROW_HEIGHT = CELL_LEADING + 2 * CELL_PAD_Y
+
+# paragraph styles (see BillResources)
+BODY_FONT, BODY_SIZE, BODY_LEADING = "Helvetica", 10, 14
+HEADER_FONT, HEADER_SIZE, HEADER_BEFORE, HEADER_AFTER = "Helvetica-Bold", 12, 8, 4
+TIMESTAMP_SIZE = 9
+
+HEADER_BLUE = colors.HexColor("#0b5ed7")
+GUEST_HEADER_BG = colors.HexColor("#e9f0ff")
+PAY_HEADER_BG = colors.HexColor("#f2f6ff")
+
+# characters platypus would treat as markup in a remarks line
+_MARKUP_CHARS = ("<", ">", "&")
+
+
+class _Cursor:
+    """Vertical position in the page-1 frame, stacking blocks like platypus.Frame."""
+
+    def __init__(self):
+        self.y = FRAME_TOP
+        self.at_top = True
+        self.prev_after = 0
+
+    def place(self, height, before=0, after=0):
+        gap = 0 if self.at_top else max(before - self.prev_after, 0)
+        bottom = self.y - gap - height
+        self.y = bottom - after
+        self.prev_after = after
+        self.at_top = False
+        return bottom
+
+
+def _cell_baseline(rowpos, fontsize, valign):
+    if valign == "MIDDLE":
+        return rowpos + (CELL_PAD_Y + ROW_HEIGHT - CELL_PAD_Y + CELL_LEADING) / 2.0 - fontsize
+    return rowpos + CELL_PAD_Y + CELL_LEADING - fontsize
+
+
+def _table_ops(ops, cursor, rows, fractions, header_bg, cell_font):
+    """
+    Queue drawing ops for a header-row table. `cell_font(r, c)` returns
+    (fontname, fontsize, color, align, valign) for each cell. Returns False
+    if a cell holds more than one line, since rows here are one line high.
+    """
+    if any("\n" in str(value) for row in rows for value in row):
+        return False
+    col_widths = [DOC_WIDTH * f for f in fractions]
+    height = ROW_HEIGHT * len(rows)
+    bottom = cursor.place(height)
+    top = bottom + height
+
+    ops.append(("rect", TABLE_X, top - ROW_HEIGHT, DOC_WIDTH, ROW_HEIGHT, header_bg))
+
+    for r, row in enumerate(rows):
+        rowpos = top - (r + 1) * ROW_HEIGHT
+        colpos = TABLE_X
+        for c, value in enumerate(row):
+            fontname, fontsize, color, align, valign = cell_font(r, c)
+            y = _cell_baseline(rowpos, fontsize, valign)
+            if align == "CENTER":
+                x = colpos + col_widths[c] / 2.0
+            else:
+                x = colpos + CELL_PAD_X
+            ops.append(("text", fontname, fontsize, color, align, x, y, str(value)))
+            colpos += col_widths[c]
+
+    ops.append(("grid", TABLE_X, bottom, col_widths, len(rows)))
+    return True
+
+
+def _paragraph_ops(ops, cursor, lines, font, size, before=0, after=0):
+    height = BODY_LEADING * len(lines)
+    bottom = cursor.place(height, before, after)
+    y = bottom + height - size
+    for line in lines:
+        ops.append(("text", font, size, colors.black, "LEFT", FRAME_X, y, line))
+        y -= BODY_LEADING
+
+
+def _page1_ops(content):
+    """Return the page-1 drawing ops, or None if the content needs the flowable engine."""
+    ops = []
+    cursor = _Cursor()
+
+    bottom = cursor.place(BODY_LEADING)
+    ops.append((
+        "text", BODY_FONT, TIMESTAMP_SIZE, colors.black, "RIGHT",
+        FRAME_X + FRAME_WIDTH, bottom + BODY_LEADING - TIMESTAMP_SIZE, content["timestamp"],
+    ))
+    cursor.place(4)
+
+    # ---------------- Guest Details ------------------------------------------------------
+    def guest_font(r, c):
+        if r == 0:
+            return "Helvetica-Bold", 10, HEADER_BLUE, "LEFT", "MIDDLE"
+        return ("Helvetica-Bold" if c == 0 else "Helvetica"), 10, colors.black, "LEFT", "MIDDLE"
+
+    _paragraph_ops(ops, cursor, ["Guest Details:"], HEADER_FONT, HEADER_SIZE, HEADER_BEFORE, HEADER_AFTER)
+    if not _table_ops(ops, cursor, content["guest_rows"], GUEST_COL_WIDTHS, GUEST_HEADER_BG, guest_font):
+        return None
+    cursor.place(8)
+
+    # ---------------- Room Details -------------------------------------------------------
+    if content["room_rows"]:
+        def room_font(r, c):
+            if r == 0:
+                return "Helvetica-Bold", 9, HEADER_BLUE, "CENTER", "BOTTOM"
+            return "Helvetica", 9, colors.black, "CENTER", "BOTTOM"
+
+        _paragraph_ops(ops, cursor, ["Room Details:"], HEADER_FONT, HEADER_SIZE, HEADER_BEFORE, HEADER_AFTER)
+        if not _table_ops(ops, cursor, content["room_rows"], ROOM_COL_WIDTHS, GUEST_HEADER_BG, room_font):
+            return None
+        cursor.place(8)
+
+    # ---------------- Payment Summary -------------------------------------------------------
+    balance_row_idx = content["balance_row_idx"]
+
+    def pay_font(r, c):
+        if r == 0:
+            return "Helvetica-Bold", 10, HEADER_BLUE, "LEFT", "BOTTOM"
+        if r == balance_row_idx:
+            return "Helvetica-Bold", 11, colors.black, "LEFT", "BOTTOM"
+        return "Helvetica", 10, colors.black, "LEFT", "BOTTOM"
+
+    _paragraph_ops(ops, cursor, ["Payment Summary:"], HEADER_FONT, HEADER_SIZE, HEADER_BEFORE, HEADER_AFTER)
+    if not _table_ops(ops, cursor, content["pay_rows"], PAY_COL_WIDTHS, PAY_HEADER_BG, pay_font):
+        return None
+    cursor.place(8)
+
+    # ---------------- Remarks -------------------------------------------------------------
+    if content["remarks"]:
+        _paragraph_ops(ops, cursor, ["Remarks:"], HEADER_FONT, HEADER_SIZE, HEADER_BEFORE, HEADER_AFTER)
+        for line in content["remarks"]:
+            if not line.strip() or any(ch in line for ch in _MARKUP_CHARS):
+                return None
+            wrapped = simpleSplit(" ".join(line.split()), BODY_FONT, BODY_SIZE, FRAME_WIDTH)
+            # simpleSplit leaves a word wider than the line whole; Paragraph breaks it
+            if any(stringWidth(w, BODY_FONT, BODY_SIZE) > FRAME_WIDTH for w in wrapped):
+                return None
+            _paragraph_ops(ops, cursor, wrapped, BODY_FONT, BODY_SIZE)
+
+    if cursor.y + cursor.prev_after < FRAME_BOTTOM:
+        return None
+
+    return ops
+
+
+def _draw_ops(canvas, ops):
+    for op in ops:
+        kind = op[0]
+        if kind == "text":
+            _, fontname, fontsize, color, align, x, y, text = op
+            canvas.setFont(fontname, fontsize)
+            canvas.setFillColor(color)
+            if align == "CENTER":
+                canvas.drawCentredString(x, y, text)
+            elif align == "RIGHT":
+                canvas.drawRightString(x, y, text)
+            else:
+                canvas.drawString(x, y, text)
+        elif kind == "rect":
+            _, x, y, w, h, color = op
+            canvas.setFillColor(color)
+            canvas.rect(x, y, w, h, stroke=0, fill=1)
+        elif kind == "grid":
+            _, x, bottom, col_widths, nrows = op
+            xs = [x]
+            for cw in col_widths:
+                xs.append(xs[-1] + cw)
+            ys = [bottom + i * ROW_HEIGHT for i in range(nrows + 1)]
+            canvas.saveState()
+            canvas.setStrokeColor(colors.grey)
+            canvas.setLineWidth(0.5)
+            canvas.grid(xs, ys)
+            canvas.restoreState()
+
+
+def render_canvas(content, target, res):
+    """
+    Draw the bill described by `content` (see Generate_Bill.bill_content) into
+    `target`. Returns False, without writing anything, if the platypus engine
+    has to be used instead.
+    """
+    with metrics.phase("story"):
+        ops = _page1_ops(content)
+    if ops is None:
+        return False
+
+    with metrics.phase("layout"):
+        _draw(Canvas(target, pagesize=A4, pageCompression=page_compression(content)), content, ops, res)
+    return True
+
+
+def _draw(canvas, content, ops, res):
+    # ---------------- PAGE 1 -------------------------------------------------------------
+    canvas.saveState()
+    draw_header_page1(canvas, None, content["title_text"], res, content["compact"], content["bill_no"])
+    canvas.restoreState()
+    _draw_ops(canvas, ops)
+    canvas.showPage()
+
+    # ---------------- PAGE 2 -------------------------------------------------------------
+    canvas.saveState()
+    draw_footer_and_signatures_page2(canvas, None)
+    canvas.restoreState()
+    get_page2(content["variant"], res).drawOn(canvas, 0, 0)
+    canvas.showPage()
+
+    canvas.save()
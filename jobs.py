@@ -0,0 +1,174 @@
+import json
+import os
+import queue
+import re
+import threading
+import time
+import uuid
+
+# ---------------------------------------------------------------------------------------------------
+# Background render jobs.
+#
+# A fixed number of worker threads take jobs from a bounded queue, so a burst of
+# async submissions never occupies the request threads. Finished jobs (and their
+# PDFs) are kept for `ttl` seconds and then dropped.
+#
+# When several server processes share one port (see serve.py) a status request
+# can land on a different process than the one running the job, so the queue can
+# mirror job state into a shared `spool_dir` that every process reads from.
+# ---------------------------------------------------------------------------------------------------
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+_JOB_ID = re.compile(r"^[0-9a-f]{32}$")
+
+
+class QueueFull(Exception):
+    """The job queue is at capacity."""
+
+
+class Job:
+    __slots__ = ("id", "status", "key", "result", "error", "created", "finished", "_fn")
+
+    def __init__(self, fn, key=None, job_id=None):
+        self.id = job_id or uuid.uuid4().hex
+        self.status = QUEUED
+        self.key = key
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.finished = None
+        self._fn = fn
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "status": self.status,
+            "created": self.created,
+            "finished": self.finished,
+            "error": self.error,
+        }
+
+
+class JobQueue:
+    def __init__(self, workers, max_pending, ttl, spool_dir=None):
+        self.workers = workers
+        self.ttl = ttl
+        self.spool_dir = spool_dir
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._started_pid = None
+
+    def _ensure_workers(self):
+        # threads do not survive fork(), so start them in whichever process submits
+        if self._started_pid == os.getpid():
+            return
+        with self._lock:
+            if self._started_pid == os.getpid():
+                return
+            self._started_pid = os.getpid()
+            for i in range(self.workers):
+                threading.Thread(target=self._worker, name=f"render-job-{i}", daemon=True).start()
+
+    def submit(self, fn, key=None):
+        """Queue `fn()` and return its Job. Raises QueueFull if there is no room."""
+        self._ensure_workers()
+        self._expire()
+        job = Job(fn, key)
+        with self._lock:
+            self._jobs[job.id] = job
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            with self._lock:
+                del self._jobs[job.id]
+            raise QueueFull()
+        self._spool(job)
+        return job
+
+    def completed(self, result, key=None):
+        """Record a job that is already done, e.g. because its PDF was cached."""
+        job = Job(None, key)
+        job.status, job.result, job.finished = DONE, result, time.time()
+        with self._lock:
+            self._jobs[job.id] = job
+        self._spool(job)
+        return job
+
+    def get(self, job_id):
+        self._expire()
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None and self.spool_dir and _JOB_ID.match(job_id):
+            job = self._unspool(job_id)
+        return job
+
+    def _worker(self):
+        while True:
+            job = self._queue.get()
+            job.status = RUNNING
+            self._spool(job)
+            try:
+                job.result = job._fn()
+                job.status = DONE
+            except Exception as e:
+                job.error = str(e)
+                job.status = FAILED
+            job._fn = None
+            job.finished = time.time()
+            self._spool(job)
+
+    def _expire(self):
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            for job_id in [j.id for j in self._jobs.values() if j.finished and j.finished < cutoff]:
+                del self._jobs[job_id]
+
+        if self.spool_dir:
+            for name in os.listdir(self.spool_dir):
+                path = os.path.join(self.spool_dir, name)
+                try:
+                    if os.path.getmtime(path) < cutoff:
+                        os.remove(path)
+                except OSError:
+                    pass
+
+    # ---------------- Shared spool -----------------------------------------------------------------
+    def _spool(self, job):
+        if not self.spool_dir:
+            return
+        base = os.path.join(self.spool_dir, job.id)
+        if job.status == DONE:
+            _write_atomic(base + ".pdf", job.result)
+        state = job.to_dict()
+        state["key"] = job.key
+        _write_atomic(base + ".json", json.dumps(state).encode("utf-8"))
+
+    def _unspool(self, job_id):
+        base = os.path.join(self.spool_dir, job_id)
+        try:
+            with open(base + ".json", "rb") as f:
+                state = json.loads(f.read())
+            if state["status"] == DONE:
+                with open(base + ".pdf", "rb") as f:
+                    result = f.read()
+            else:
+                result = None
+        except (OSError, ValueError, KeyError):
+            return None
+
+        job = Job(None, state.get("key"), job_id)
+        job.status = state["status"]
+        job.created = state.get("created")
+        job.finished = state.get("finished")
+        job.error = state.get("error")
+        job.result = result
+        return job
+
+
+def _write_atomic(path, data):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
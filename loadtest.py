@@ -0,0 +1,331 @@
+"""
+Local HTTP load generator for the bill app.
+
+    python loadtest.py --workers 4 --stages 1,4,8,16 --duration 20
+
+Every POST /generate saves a booking, takes a bill number and archives a PDF.
+So by default the load test starts its own server from this checkout, with an
+empty database, bill archive and login in a temporary directory that is
+deleted afterwards. To test a server that is already running, give --url; that
+also needs --allow-writes, since the bookings land in that server's database.
+
+Each virtual user keeps one keep-alive connection and picks routes at random
+using the weights below: the form page, the assets it links to (at the
+fingerprinted /assets/ URLs from the build manifest, see assets.py) and POST
+/generate with the same fields the billForm in templates/index.html submits.
+Concurrency ramps through --stages and every stage gets a per-route report of
+throughput, error rate and latency percentiles. Random bookings overlap each other, so
+/generate posts allow_overlap=1 as the form does once staff confirm a clash
+(--check-overlap leaves it off); 409 answers are counted as conflicts, not errors.
+"""
+import argparse
+import base64
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from urllib.parse import urlencode, urlsplit
+
+from assets import AssetStore
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# (name, method, path, weight); PAGE_ASSETS are added by page_routes()
+ROUTES = [
+    ("home", "GET", "/", 2),
+    ("generate", "POST", "/generate", 3),
+]
+# what templates/index.html loads, by source name
+PAGE_ASSETS = ["app.css", "app.js", "logo.png", "PK.png"]
+ASSET_WEIGHT = 2
+
+EVENT_TYPES = ["Wedding", "Reception", "Engagement", "Birthday", "Half Saree", "Upanayanam"]
+FIRST_NAMES = ["Ravi", "Lakshmi", "Suresh", "Padma", "Venkat", "Anitha", "Srinivas", "Kavya"]
+LAST_NAMES = ["Reddy", "Naidu", "Sharma", "Rao", "Chowdary", "Varma"]
+
+
+def booking_form(rng, repeat_ratio, allow_overlap=True):
+    """A billForm submission, including the readonly totals the browser also posts."""
+    if rng.random() < repeat_ratio:
+        rng = random.Random(0)
+
+    checkin = datetime(2026, 1, 1, 10) + timedelta(days=rng.randrange(365), hours=rng.choice([0, 4, 8]))
+    checkout = checkin + timedelta(days=rng.choice([1, 1, 2, 3]))
+    days = max(1, (checkout - checkin).days)
+
+    form = {
+        "name": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+        "pax": str(rng.randrange(50, 800, 10)),
+        "mobile": str(rng.randrange(6000000000, 9999999999)),
+        "event_type": rng.choice(EVENT_TYPES),
+        "checkin": checkin.strftime("%Y-%m-%dT%H:%M"),
+        "checkout": checkout.strftime("%Y-%m-%dT%H:%M"),
+        "function_rent": str(rng.randrange(20000, 90000, 500)),
+        "cleaning_charges": str(rng.choice([2000, 3000, 4000])),
+        "security_charges": str(rng.choice([5000, 10000])),
+        "electricity_charges": str(rng.choice([10, 12, 15])),
+        "remarks": rng.choice(["", "Stage decoration by customer.", "Extra chairs\nValet parking"]),
+    }
+
+    room_total = 0
+    if rng.random() < 0.5:
+        # disabled inputs are not submitted, so room fields only appear when checked
+        # the server rejects a room booking with no rooms, so double is always filled
+        d_n, d_r = rng.randrange(1, 10), rng.choice([1500, 1800, 2200])
+        t_n, t_r = rng.randrange(0, 6), rng.choice([2000, 2400])
+        form.update({
+            "room_needed": "on",
+            "double_rooms": str(d_n), "double_extra": str(rng.randrange(0, 2)),
+            "double_ac": rng.choice(["AC", "Non-AC"]), "double_rent": str(d_r),
+            "triple_rooms": str(t_n), "triple_extra_bed": str(rng.randrange(0, 2)),
+            "triple_ac": rng.choice(["AC", "Non-AC"]), "triple_rent_per_room": str(t_r),
+        })
+        room_total = d_n * d_r + t_n * t_r
+
+    advance = rng.choice([0, 0, 10000, 25000])
+    form["advance"] = str(advance)
+    if advance > 0:
+        form["advance_mode"] = rng.choice(["Cash", "UPI"])
+
+    per_day = room_total + int(form["function_rent"]) + int(form["cleaning_charges"]) + int(form["security_charges"])
+    total = per_day * days
+    form["total_rent"] = f"{total:.2f}"
+    form["balance"] = f"{total - advance:.2f}"
+    if allow_overlap:
+        form["allow_overlap"] = "1"
+    return form
+
+
+def page_routes(build_dir=None):
+    """ROUTES plus each page asset at the fingerprinted URL the page links to."""
+    static = os.path.join(HERE, "static")
+    store = AssetStore(static, build_dir or os.path.join(static, ".build"))
+    store.load()
+    routes = list(ROUTES)
+    for name in PAGE_ASSETS:
+        built = store.built_name(name)
+        if built is None:
+            raise SystemExit(f"{name} is not in the asset manifest")
+        routes.insert(-1, (name, "GET", f"/assets/{built}", ASSET_WEIGHT))
+    return routes
+
+
+@contextmanager
+def throwaway_server(workers, asset_build_dir=None, startup_timeout=60):
+    """Serve this checkout on a free local port with its own empty database, archive and login; yields the URL."""
+    with tempfile.TemporaryDirectory(prefix="loadtest-") as tmp:
+        env = dict(
+            os.environ,
+            BOOKING_DB=os.path.join(tmp, "bookings.db"),
+            BILL_ARCHIVE_DIR=os.path.join(tmp, "archive"),
+            AUTH_FILE=os.path.join(tmp, "credentials.txt"),
+            SESSION_SECRET_FILE=os.path.join(tmp, "session_secret"),
+            STARTUP_LOG=os.path.join(tmp, "startup_log.txt"),
+        )
+        if asset_build_dir:
+            env["ASSET_BUILD_DIR"] = asset_build_dir
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            port = s.getsockname()[1]
+
+        log_path = os.path.join(tmp, "server.log")
+        with open(log_path, "wb") as log:
+            server = subprocess.Popen(
+                [sys.executable, "-m", "app", "serve", "--host", "127.0.0.1", "--port", str(port),
+                 "--workers", str(workers)],
+                cwd=HERE, env=env, stdout=log, stderr=subprocess.STDOUT,
+            )
+        try:
+            deadline = time.monotonic() + startup_timeout
+            while True:
+                try:
+                    socket.create_connection(("127.0.0.1", port), timeout=1).close()
+                    break
+                except OSError:
+                    if server.poll() is not None or time.monotonic() > deadline:
+                        with open(log_path, errors="replace") as f:
+                            raise SystemExit(f"Throwaway server did not start:\n{f.read()}")
+                    time.sleep(0.2)
+            yield f"http://127.0.0.1:{port}"
+        finally:
+            server.terminate()
+            try:
+                server.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                server.kill()
+                server.wait()
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    k = (len(ordered) - 1) * pct / 100.0
+    lo, hi = int(k), min(int(k) + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+class Stats:
+    def __init__(self, routes):
+        self.latencies = {name: [] for name, *_ in routes}
+        self.errors = {name: 0 for name, *_ in routes}
+        self.conflicts = {name: 0 for name, *_ in routes}
+        self.statuses = {name: {} for name, *_ in routes}
+        self._lock = threading.Lock()
+
+    def record(self, route, ms, status):
+        with self._lock:
+            self.latencies[route].append(ms)
+            codes = self.statuses[route]
+            codes[status] = codes.get(status, 0) + 1
+            if status == 409:
+                # the hall is already booked: a correct answer, not a failure
+                self.conflicts[route] += 1
+            elif not isinstance(status, int) or status >= 400:
+                self.errors[route] += 1
+
+    def report(self, elapsed):
+        out = {}
+        for name in self.latencies:
+            lat = self.latencies[name]
+            n = len(lat)
+            out[name] = {
+                "requests": n,
+                "rps": round(n / elapsed, 2) if elapsed else 0.0,
+                "error_rate": round(self.errors[name] / n, 4) if n else 0.0,
+                "conflict_rate": round(self.conflicts[name] / n, 4) if n else 0.0,
+                "p50_ms": round(percentile(lat, 50), 2),
+                "p95_ms": round(percentile(lat, 95), 2),
+                "p99_ms": round(percentile(lat, 99), 2),
+                "statuses": {str(k): v for k, v in sorted(self.statuses[name].items(), key=str)},
+            }
+        return out
+
+
+def virtual_user(routes, target, auth_header, stop_at, stats, seed, repeat_ratio, timeout, allow_overlap):
+    rng = random.Random(seed)
+    names = [r[0] for r in routes]
+    weights = [r[3] for r in routes]
+    by_name = {r[0]: r for r in routes}
+    conn = None
+
+    while time.monotonic() < stop_at:
+        name, method, path, _ = by_name[rng.choices(names, weights)[0]]
+        headers = {"Authorization": auth_header}
+        body = None
+        if method == "POST":
+            body = urlencode(booking_form(rng, repeat_ratio, allow_overlap))
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+
+        t0 = time.perf_counter()
+        try:
+            if conn is None:
+                conn = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=timeout)
+            conn.request(method, path, body=body, headers=headers)
+            resp = conn.getresponse()
+            resp.read()
+            status = resp.status
+            if resp.getheader("Connection", "").lower() == "close":
+                conn.close()
+                conn = None
+        except (OSError, http.client.HTTPException) as e:
+            status = type(e).__name__
+            if conn is not None:
+                conn.close()
+            conn = None
+        stats.record(name, (time.perf_counter() - t0) * 1000, status)
+
+    if conn is not None:
+        conn.close()
+
+
+def run_stage(routes, target, auth_header, concurrency, duration, repeat_ratio, timeout, allow_overlap=True):
+    stats = Stats(routes)
+    stop_at = time.monotonic() + duration
+    threads = [
+        threading.Thread(
+            target=virtual_user,
+            args=(routes, target, auth_header, stop_at, stats, concurrency * 1000 + i, repeat_ratio, timeout,
+                  allow_overlap),
+            daemon=True,
+        )
+        for i in range(concurrency)
+    ]
+    start = time.monotonic()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return stats.report(time.monotonic() - start)
+
+
+def print_stage(concurrency, report):
+    print(f"\n== concurrency {concurrency} ==")
+    print(f"{'route':12} {'reqs':>7} {'req/s':>8} {'errors':>7} {'409s':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for name, r in report.items():
+        print(
+            f"{name:12} {r['requests']:7d} {r['rps']:8.1f} {r['error_rate']:7.1%} {r['conflict_rate']:7.1%} "
+            f"{r['p50_ms']:8.1f} {r['p95_ms']:8.1f} {r['p99_ms']:8.1f}"
+        )
+
+
+def run(args, routes, url):
+    target = urlsplit(url)
+    auth_header = "Basic " + base64.b64encode(f"{args.user}:{args.password}".encode()).decode()
+
+    results = []
+    for concurrency in [int(c) for c in args.stages.split(",") if c.strip()]:
+        report = run_stage(
+            routes, target, auth_header, concurrency, args.duration, args.repeat_ratio, args.timeout,
+            not args.check_overlap,
+        )
+        print_stage(concurrency, report)
+        results.append({"concurrency": concurrency, "duration": args.duration, "routes": report})
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"url": url, "stages": results}, f, indent=2)
+        print(f"\nWrote {args.out}")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="a running server to test (default: start a throwaway one)")
+    parser.add_argument("--allow-writes", action="store_true",
+                        help="let --url save the load test's bookings in its database")
+    parser.add_argument("--workers", type=int, default=2, help="worker processes for the throwaway server")
+    parser.add_argument("--user", default="admin")
+    parser.add_argument("--password", default="bill123")
+    parser.add_argument("--stages", default="1,2,4,8", help="comma-separated concurrency levels")
+    parser.add_argument("--duration", type=float, default=15, help="seconds per stage")
+    parser.add_argument("--repeat-ratio", type=float, default=0.0,
+                        help="fraction of /generate posts that resend one fixed booking")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--check-overlap", action="store_true",
+                        help="do not send allow_overlap=1, so clashing bookings get 409")
+    parser.add_argument("--asset-build-dir", default=os.environ.get("ASSET_BUILD_DIR"),
+                        help="the server's ASSET_BUILD_DIR, if it is not static/.build")
+    parser.add_argument("--out", help="write all stage reports as JSON to this file")
+    args = parser.parse_args(argv)
+    if args.url and not args.allow_writes:
+        parser.error("every POST /generate saves a booking in the server's database; "
+                     "pass --allow-writes to test --url anyway, or leave --url out to test a throwaway server")
+    routes = page_routes(args.asset_build_dir)
+
+    if args.url:
+        return run(args, routes, args.url)
+    with throwaway_server(args.workers, args.asset_build_dir) as url:
+        return run(args, routes, url)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,206 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# ---------------------------------------------------------------------------------------------------
+# Hot-path timing and Prometheus text exposition.
+#
+# `phase(name)` times a block of work. The duration goes into a process-wide
+# histogram and, if a request is being timed on this thread (start_request),
+# into that request's breakdown for the Server-Timing header. Counters and
+# gauges are read at scrape time. Work done inside muted() (the startup warm-up
+# render) is not recorded at all. Stdlib only, so the renderer can use it too.
+# Each server worker process keeps its own numbers.
+# ---------------------------------------------------------------------------------------------------
+
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+
+_lock = threading.Lock()
+_histograms = {}   # (metric, labels) -> Histogram
+_counters = {}     # (metric, labels) -> number
+_callbacks = {}    # (metric, labels) -> (kind, callable returning a number)
+_in_flight = {}    # metric -> number of blocks currently inside in_flight(metric)
+_help = {}
+_local = threading.local()
+
+
+def _labels(labels):
+    return tuple(sorted(labels.items()))
+
+
+def recording():
+    """False inside muted() on this thread."""
+    return not getattr(_local, "muted", False)
+
+
+@contextmanager
+def muted():
+    """Record nothing from this thread inside the block."""
+    _local.muted = True
+    try:
+        yield
+    finally:
+        _local.muted = False
+
+
+def observe(metric, seconds, **labels):
+    if not recording():
+        return
+    key = (metric, _labels(labels))
+    with _lock:
+        hist = _histograms.get(key)
+        if hist is None:
+            hist = _histograms[key] = Histogram()
+        hist.observe(seconds)
+
+
+def inc(metric, amount=1, **labels):
+    if not recording():
+        return
+    key = (metric, _labels(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+def gauge(metric, fn, help_text=None, kind="gauge", **labels):
+    """Register `fn()` to be read whenever /metrics is scraped (kind "gauge" or "counter")."""
+    _callbacks[(metric, _labels(labels))] = (kind, fn)
+    if help_text:
+        _help[metric] = help_text
+
+
+def describe(metric, help_text):
+    _help[metric] = help_text
+
+
+@contextmanager
+def in_flight(metric):
+    """Count how many threads are inside this block, exported as a gauge."""
+    if not recording():
+        yield
+        return
+    with _lock:
+        _in_flight[metric] = _in_flight.get(metric, 0) + 1
+    try:
+        yield
+    finally:
+        with _lock:
+            _in_flight[metric] -= 1
+
+
+# ---------------- Per-request timing -------------------------------------------------------------
+def start_request():
+    _local.timings = []
+    _local.started = time.perf_counter()
+
+
+def finish_request():
+    """
+    Stop timing this thread's request. Returns ([(phase, seconds)], total_seconds)
+    with repeated phases summed, in the order they first ran.
+    """
+    timings = getattr(_local, "timings", None)
+    if timings is None:
+        return [], 0.0
+    total = time.perf_counter() - _local.started
+    _local.timings = None
+
+    merged = {}
+    for name, seconds in timings:
+        merged[name] = merged.get(name, 0.0) + seconds
+    return list(merged.items()), total
+
+
+@contextmanager
+def phase(name):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - t0
+        observe("bill_phase_seconds", elapsed, phase=name)
+        timings = getattr(_local, "timings", None)
+        if timings is not None:
+            timings.append((name, elapsed))
+
+
+def server_timing(timings, total):
+    parts = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in timings]
+    parts.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(parts)
+
+
+# ---------------- Exposition ---------------------------------------------------------------------
+def _fmt_labels(labels, extra=()):
+    items = list(labels) + list(extra)
+    if not items:
+        return ""
+    inner = ",".join('{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"')) for k, v in items)
+    return "{" + inner + "}"
+
+
+def _header(lines, seen, metric, kind):
+    if metric in seen:
+        return
+    seen.add(metric)
+    if metric in _help:
+        lines.append(f"# HELP {metric} {_help[metric]}")
+    lines.append(f"# TYPE {metric} {kind}")
+
+
+def render():
+    """All metrics in Prometheus text format (version 0.0.4)."""
+    lines = []
+    seen = set()
+    with _lock:
+        histograms = sorted((k, (list(h.counts), h.sum, h.count)) for k, h in _histograms.items())
+        counters = sorted(_counters.items())
+        in_flight = sorted(_in_flight.items())
+
+    for (metric, labels), (counts, total, count) in histograms:
+        _header(lines, seen, metric, "histogram")
+        cumulative = 0
+        for bound, n in zip(BUCKETS + (float("inf"),), counts):
+            cumulative += n
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            lines.append(f"{metric}_bucket{_fmt_labels(labels, [('le', le)])} {cumulative}")
+        lines.append(f"{metric}_sum{_fmt_labels(labels)} {total:.6f}")
+        lines.append(f"{metric}_count{_fmt_labels(labels)} {count}")
+
+    for (metric, labels), value in counters:
+        _header(lines, seen, metric, "counter")
+        lines.append(f"{metric}{_fmt_labels(labels)} {value}")
+
+    for metric, value in in_flight:
+        _header(lines, seen, metric, "gauge")
+        lines.append(f"{metric} {value}")
+
+    for (metric, labels), (kind, fn) in sorted(_callbacks.items(), key=lambda kv: kv[0]):
+        _header(lines, seen, metric, kind)
+        try:
+            value = fn()
+        except Exception:
+            continue
+        lines.append(f"{metric}{_fmt_labels(labels)} {value}")
+
+    return "\n".join(lines) + "\n"
+
+
+describe("bill_phase_seconds", "Time spent in each phase of handling a bill request.")
+describe("bill_request_seconds", "Total request handling time by route.")
+describe("bill_renders_total", "Bills rendered, by engine.")
+describe("bill_renders_in_flight", "Bills being rendered right now.")
@@ -0,0 +1,79 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+# ---------------------------------------------------------------------------------------------------
+# Content-addressed cache of rendered bills.
+#
+# The key is a SHA-256 of the normalized booking (plus anything else that changes
+# the bytes, e.g. the engine), so pressing Generate again with the same form is
+# served from memory. Entries are evicted least-recently-used once either the
+# byte budget or the entry limit is exceeded.
+# ---------------------------------------------------------------------------------------------------
+
+# fields that are bookkeeping rather than bill content
+UNKEYED_FIELDS = ("booked_at",)
+
+
+def normalize_booking(data):
+    """Strip whitespace and map missing/None values to "" so equivalent forms compare equal."""
+    out = {}
+    for k, v in data.items():
+        if k in UNKEYED_FIELDS:
+            continue
+        v = "" if v is None else str(v).strip()
+        if v:
+            out[k] = v
+    return out
+
+
+def booking_key(data, *extra):
+    payload = json.dumps([normalize_booking(data), extra], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class PdfCache:
+    def __init__(self, max_bytes, max_entries):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0 and self.max_entries > 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            pdf = self._entries.get(key)
+            if pdf is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return pdf
+
+    def put(self, key, pdf):
+        if not self.enabled or len(pdf) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+            self._entries[key] = pdf
+            self.size += len(pdf)
+            while self.size > self.max_bytes or len(self._entries) > self.max_entries:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
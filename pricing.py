@@ -0,0 +1,85 @@
+from booking import ZERO
+
+# ---------------------------------------------------------------------------------------------------
+# Pricing engine.
+#
+# The one place the money on a bill is worked out. The PDF's Payment Summary,
+# the booking store's total columns and POST /api/quote (which the form uses
+# for its live totals) all read from compute_totals()/quote(), so a price shown
+# in the browser is the price printed on the bill. Stdlib only, no ReportLab.
+# ---------------------------------------------------------------------------------------------------
+
+
+def _amount(v):
+    return v if v is not None else ZERO
+
+
+def compute_totals(booking):
+    """
+    The money on the bill, as Decimals. Electricity is quoted per unit and is
+    not part of the total; rooms only count when room_needed is ticked.
+    """
+    room_total = ZERO
+    if booking.room_needed:
+        room_total = (
+            _amount(booking.double_rent) * (booking.double_rooms or 0)
+            + _amount(booking.triple_rent_per_room) * (booking.triple_rooms or 0)
+        )
+    f_rent = _amount(booking.function_rent)
+    clean = _amount(booking.cleaning_charges)
+    sec = _amount(booking.security_charges)
+    elec = _amount(booking.electricity_charges)
+    advance_amt = booking.advance
+    days = booking.days
+
+    per_day_total = room_total + f_rent + clean + sec
+    total_rent = per_day_total * days
+    balance = total_rent - advance_amt
+
+    return {
+        "room_total": room_total,
+        "function_rent": f_rent,
+        "cleaning": clean,
+        "security": sec,
+        "electricity_per_unit": elec,
+        "per_day_total": per_day_total,
+        "days": days,
+        "total_rent": total_rent,
+        "advance": advance_amt,
+        "balance": balance,
+    }
+
+
+def day_charges(booking, totals):
+    """[(label, amount)] making up the per-day total, in bill order."""
+    lines = []
+    if booking.room_needed:
+        lines.append(("Room Rent", totals["room_total"]))
+    lines.extend([
+        ("Function Hall Rent", totals["function_rent"]),
+        ("Cleaning", totals["cleaning"]),
+        ("Security", totals["security"]),
+    ])
+    return lines
+
+
+def money(v):
+    return f"{v:.2f}"
+
+
+def quote(booking):
+    """JSON-ready price breakdown for `booking`; amounts are strings with 2 decimals."""
+    totals = compute_totals(booking)
+    return {
+        "lines": [
+            {"label": label, "amount": money(amount)}
+            for label, amount in day_charges(booking, totals)
+        ],
+        "per_day_total": money(totals["per_day_total"]),
+        "days": totals["days"],
+        "total_rent": money(totals["total_rent"]),
+        "advance": money(totals["advance"]),
+        "balance": money(totals["balance"]),
+        "electricity_per_unit": money(totals["electricity_per_unit"]),
+        "confirmed": booking.confirmed,
+    }
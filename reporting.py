@@ -0,0 +1,304 @@
+import csv
+import io
+import threading
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import numpy as np
+
+from booking import Booking, BookingError
+from booking_store import SyncedIndex
+from pricing import compute_totals
+
+# ---------------------------------------------------------------------------------------------------
+# Revenue and occupancy reports over stored bookings.
+#
+# Each booking is priced once, with the same pricing engine as its bill, when
+# it is loaded, and becomes one row of a set of NumPy columns. Reports are
+# grouped sums over those columns (np.unique + np.add.at), so their cost
+# does not depend on Python-level per-booking work. The unfiltered reports
+# are kept as rollups: when a sync brings new bookings (the ledger is a
+# SyncedIndex) only the new rows are aggregated and added in. Money is held and summed as int64 paise, so sums
+# are exact; a booking whose values do not fit in int64 is left out rather
+# than stopping the load.
+# A booking that is replaced or cancelled stays in the columns but is marked
+# not live: it is left out of every report and taken back out of the rollups.
+# ---------------------------------------------------------------------------------------------------
+
+# same offset as Generate_Bill.IST; booked_at is reported as a local date
+REPORT_TZ = timezone(timedelta(hours=5, minutes=30))
+
+GROUPS = ("day", "month", "event_type", "payment_mode")
+BASES = ("event", "booked")   # date a booking counts on: its checkin or when it was made
+
+# summed per group, in output order
+METRICS = ("bookings", "quotations", "revenue", "quoted", "advance", "balance", "hall_days", "room_nights")
+MONEY_METRICS = ("revenue", "quoted", "advance", "balance")
+
+UNSPECIFIED = "unspecified"
+
+_EPOCH = datetime(1970, 1, 1).toordinal()
+_INT64 = np.iinfo(np.int64)
+_INT_COLUMNS = (
+    "id", "event_day", "booked_day", "span_days", "confirmed", "days", "rooms",
+    "total", "advance", "balance", "event_code", "mode_code", "live",
+)
+
+
+class ReportError(ValueError):
+    """Unknown grouping, basis or date in a report request."""
+
+
+def _paise(amount):
+    return int((amount * 100).to_integral_value())
+
+
+def _rupees(paise):
+    return str(Decimal(int(paise)).scaleb(-2))
+
+
+def _day(dt):
+    return dt.toordinal() - _EPOCH
+
+
+def parse_day(raw):
+    """"YYYY-MM-DD" as days since 1970-01-01, or None if blank."""
+    if not raw:
+        return None
+    try:
+        return _day(datetime.strptime(raw, "%Y-%m-%d"))
+    except ValueError:
+        raise ReportError(f"Dates must be YYYY-MM-DD: {raw!r}")
+
+
+class Ledger(SyncedIndex):
+    def __init__(self):
+        super().__init__()
+        self.n = 0
+        self._cols = {name: np.zeros(0, dtype=np.int64) for name in _INT_COLUMNS}
+        self._categories = {"event_code": [], "mode_code": []}
+        self._codes = {"event_code": {}, "mode_code": {}}
+        self._occupied = np.zeros(0, dtype=np.int64)   # sorted days the hall is booked
+        self._rollups = {}                              # (group, basis) -> [rows covered, {key: sums}]
+        self._lock = threading.Lock()
+
+    # ---------------- Loading ------------------------------------------------------------------
+    def _code(self, column, label):
+        label = label or UNSPECIFIED
+        codes = self._codes[column]
+        if label not in codes:
+            codes[label] = len(codes)
+            self._categories[column].append(label)
+        return codes[label]
+
+    def _row(self, stored):
+        booking = Booking.from_form(stored["data"], strict=False)
+        totals = compute_totals(booking)
+        booked_at = datetime.fromisoformat(stored["booked_at"])
+        if booked_at.tzinfo is not None:
+            booked_at = booked_at.astimezone(REPORT_TZ)
+        rooms = (booking.double_rooms or 0) + (booking.triple_rooms or 0) if booking.room_needed else 0
+        # calendar days the hall is in use; a checkout at 00:00 does not touch that day
+        last = booking.checkout - timedelta(minutes=1)
+        return (
+            stored["id"],
+            _day(booking.checkin),
+            _day(booked_at),
+            _day(last) - _day(booking.checkin) + 1,
+            int(booking.confirmed),
+            totals["days"],
+            rooms,
+            _paise(totals["total_rent"]),
+            _paise(totals["advance"]),
+            _paise(totals["balance"]),
+            self._code("event_code", booking.event_type),
+            self._code("mode_code", booking.advance_mode if booking.confirmed else ""),
+            1,
+        )
+
+    def sync(self, store):
+        with self._lock:
+            super().sync(store)
+
+    def _take(self, stored_rows):
+        rows = []
+        try:
+            for stored in stored_rows:
+                try:
+                    rows.append(_fits_int64(self._row(stored)))
+                except (BookingError, ArithmeticError, ValueError):
+                    # saved before the form was validated on the server, or too large to sum
+                    pass
+        finally:
+            # rows converted before an unexpected error are kept; the rest are read again next sync
+            if rows:
+                self._extend(rows)
+
+    def _extend(self, rows):
+        new = np.array(rows, dtype=np.int64)
+        for i, name in enumerate(_INT_COLUMNS):
+            self._cols[name] = np.concatenate([self._cols[name], new[:, i]])
+        self.n += len(rows)
+
+        confirmed = new[:, _INT_COLUMNS.index("confirmed")] == 1
+        starts = new[confirmed, _INT_COLUMNS.index("event_day")]
+        spans = new[confirmed, _INT_COLUMNS.index("span_days")]
+        self._occupied = np.union1d(self._occupied, _booked_days(starts, spans))
+
+    def _drop(self, ids):
+        """Mark the rows of voided bookings not live and take them out of the rollups."""
+        c = self._cols
+        ids = np.asarray(ids, dtype=np.int64)
+        pos = np.searchsorted(c["id"], ids)     # rows are in id order
+        found = pos < self.n
+        pos, ids = pos[found], ids[found]
+        pos = pos[(c["id"][pos] == ids) & (c["live"][pos] == 1)]
+        if not len(pos):
+            return
+
+        for (group, basis), entry in self._rollups.items():
+            covered, sums = entry
+            for key, values in self._aggregate(group, basis, pos[pos < covered]).items():
+                sums[key] = sums[key] - values
+                if not sums[key][0] and not sums[key][1]:   # no bookings or quotations left
+                    del sums[key]
+        c["live"][pos] = 0
+
+        confirmed = (c["confirmed"] == 1) & (c["live"] == 1)
+        self._occupied = _booked_days(c["event_day"][confirmed], c["span_days"][confirmed])
+
+    # ---------------- Aggregation --------------------------------------------------------------
+    def _keys(self, group, basis, sel):
+        c = self._cols
+        if group == "event_type":
+            return c["event_code"][sel]
+        if group == "payment_mode":
+            return c["mode_code"][sel]
+        day = c["event_day" if basis == "event" else "booked_day"][sel]
+        if group == "day":
+            return day
+        return day.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+
+    def _aggregate(self, group, basis, sel):
+        """{key: int64 array of METRICS} summed over the live rows picked by `sel` (slice, mask or positions)."""
+        sel = np.arange(self.n)[sel]
+        sel = sel[self._cols["live"][sel] == 1]
+        keys = self._keys(group, basis, sel)
+        if not len(keys):
+            return {}
+        c = {name: col[sel] for name, col in self._cols.items()}
+
+        confirmed = c["confirmed"]
+        quotation = 1 - confirmed
+        weights = (
+            confirmed,
+            quotation,
+            c["total"] * confirmed,
+            c["total"] * quotation,
+            c["advance"],
+            c["balance"] * confirmed,
+            c["days"] * confirmed,
+            c["rooms"] * c["days"] * confirmed,
+        )
+        uniq, inverse = np.unique(keys, return_inverse=True)
+        # np.add.at rather than np.bincount, whose weights are summed as float64
+        sums = np.zeros((len(uniq), len(weights)), dtype=np.int64)
+        np.add.at(sums, inverse, np.stack(weights, axis=1))
+        return dict(zip(uniq.tolist(), sums))
+
+    def _rollup(self, group, basis):
+        entry = self._rollups.setdefault((group, basis), [0, {}])
+        covered, sums = entry
+        if covered < self.n:
+            for key, values in self._aggregate(group, basis, slice(covered, self.n)).items():
+                sums[key] = sums[key] + values if key in sums else values
+            entry[0] = self.n
+        return dict(sums)
+
+    def report(self, group, basis="event", start=None, end=None):
+        """
+        Rows of {group: label, metric: value, ...} sorted by group. `start` and
+        `end` (days since 1970, end exclusive) limit the basis date.
+        """
+        if group not in GROUPS:
+            raise ReportError(f"Unknown grouping: {group}")
+        if basis not in BASES:
+            raise ReportError(f"Unknown basis: {basis}")
+
+        with self._lock:
+            if start is None and end is None:
+                sums = self._rollup(group, basis)
+            else:
+                day = self._cols["event_day" if basis == "event" else "booked_day"]
+                mask = np.ones(self.n, dtype=bool)
+                if start is not None:
+                    mask &= day >= start
+                if end is not None:
+                    mask &= day < end
+                sums = self._aggregate(group, basis, mask)
+            occupied = self._occupied
+
+        rows = []
+        for key in sorted(sums):
+            row = {group: self._label(group, key)}
+            for name, value in zip(METRICS, sums[key]):
+                row[name] = _rupees(value) if name in MONEY_METRICS else int(value)
+            rows.append(row)
+
+        if group in ("day", "month"):
+            self._add_occupancy(rows, group, sorted(sums), occupied)
+        else:
+            rows.sort(key=lambda row: row[group])
+        return rows
+
+    def _label(self, group, key):
+        if group == "event_type":
+            return self._categories["event_code"][key]
+        if group == "payment_mode":
+            return self._categories["mode_code"][key]
+        return str(np.datetime64(key, "D" if group == "day" else "M"))
+
+    @staticmethod
+    def _add_occupancy(rows, group, keys, occupied):
+        """Share of the period's days on which the hall was booked (confirmed bookings)."""
+        keys = np.array(keys, dtype=np.int64)
+        if group == "day":
+            booked = np.isin(keys, occupied).astype(np.int64)
+            period = np.ones(len(keys), dtype=np.int64)
+        else:
+            months, counts = np.unique(
+                occupied.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64), return_counts=True
+            )
+            by_month = dict(zip(months.tolist(), counts.tolist()))
+            booked = [by_month.get(k, 0) for k in keys.tolist()]
+            first = keys.astype("datetime64[M]").astype("datetime64[D]")
+            period = ((keys + 1).astype("datetime64[M]").astype("datetime64[D]") - first).astype(np.int64)
+        for row, b, p in zip(rows, booked, period):
+            row["hall_days_booked"] = int(b)
+            row["hall_occupancy"] = round(int(b) / int(p), 4)
+
+
+def _fits_int64(row):
+    if not all(_INT64.min <= v <= _INT64.max for v in row):
+        raise OverflowError("too large for the report columns")
+    return row
+
+
+def _booked_days(starts, spans):
+    """Sorted distinct days covered by stays starting on `starts` and lasting `spans` days."""
+    # one entry per booked day: each start repeated span times, plus 0..span-1
+    offsets = np.arange(spans.sum()) - np.repeat(np.cumsum(spans) - spans, spans)
+    return np.unique(np.repeat(starts, spans) + offsets)
+
+
+def columns(group):
+    occupancy = ["hall_days_booked", "hall_occupancy"] if group in ("day", "month") else []
+    return [group, *METRICS, *occupancy]
+
+
+def to_csv(rows, group):
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=columns(group), lineterminator="\n")
+    writer.writeheader()
+    writer.writerows(rows)
+    return out.getvalue()
@@ -63,7 +63,7 @@ if %ERRORLEVEL% EQU 0 (
 
 REM Start Flask app in minimized window
 echo Starting Flask application... >> "%LOGFILE%" 2>&1
-start "Flask Bill App" /MIN python app.py >> "%LOGFILE%" 2>&1
+start "Flask Bill App" /MIN python -m app serve >> "%LOGFILE%" 2>&1
 
 REM Wait a moment and verify it started
 timeout /t 3 /nobreak >nul 2>&1
@@ -0,0 +1,125 @@
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+
+from werkzeug.serving import make_server
+
+# ---------------------------------------------------------------------------------------------------
+# Production server: a pre-fork pool of threaded WSGI workers.
+#
+# The parent binds the listening socket and has already imported ReportLab and
+# Generate_Bill (app.main does this) before forking, so every worker starts warm and
+# shares those pages copy-on-write. The kernel spreads incoming connections
+# across the workers accepting on the shared socket. A worker exits after
+# `max_renders` bills and the parent starts a fresh one in its place.
+#
+# Platforms without fork() (Windows) run a single threaded worker in-process.
+# Nothing would restart it, so it is never recycled.
+# ---------------------------------------------------------------------------------------------------
+
+WORKER_POLL_SECONDS = 0.5
+# default for --max-renders when there is a parent to restart workers
+MAX_RENDERS_PER_WORKER = 1000
+
+
+def _listen(host, port, backlog=128):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _renders_completed():
+    import Generate_Bill
+    return Generate_Bill.renders_completed
+
+
+def _run_worker(app, host, port, sock, max_renders):
+    """Serve on the shared socket until `max_renders` bills have been rendered."""
+    server = make_server(host, port, app, threaded=True, fd=sock.fileno())
+    # let in-flight requests finish when recycling instead of dropping them
+    server.daemon_threads = False
+
+    def recycle_when_spent():
+        start = _renders_completed()
+        while _renders_completed() - start < max_renders:
+            time.sleep(WORKER_POLL_SECONDS)
+        server.shutdown()
+
+    if max_renders:
+        threading.Thread(target=recycle_when_spent, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=server.shutdown).start())
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+def can_fork():
+    return hasattr(os, "fork")
+
+
+def serve(app, host="0.0.0.0", port=5000, workers=2, max_renders=0, log=print):
+    sock = _listen(host, port)
+
+    if workers <= 1 or not can_fork():
+        log(f"Serving on http://{host}:{port} (single process)")
+        if max_renders:
+            log("Not recycling after max_renders bills: a single process has no parent to restart it")
+        _run_worker(app, host, port, sock, 0)
+        return
+
+    log(f"Serving on http://{host}:{port} with {workers} workers")
+
+    children = set()
+    stopping = False
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGINT, signal.SIG_IGN)
+            code = 0
+            try:
+                _run_worker(app, host, port, sock, max_renders)
+            except BaseException:
+                code = 1
+            finally:
+                os._exit(code)
+        children.add(pid)
+        log(f"Started worker {pid}")
+
+    def stop(*_):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except OSError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    for _ in range(workers):
+        spawn()
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        children.discard(pid)
+        if not stopping:
+            log(f"Worker {pid} exited ({os.waitstatus_to_exitcode(status)}), restarting")
+            spawn()
+
+    sock.close()
+    sys.exit(0)
@@ -0,0 +1,109 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+import metrics
+
+# ---------------------------------------------------------------------------------------------------
+# Startup timing and the ReportLab warm-up.
+#
+# app.py no longer imports Generate_Bill (and with it all of ReportLab) when
+# it loads, so the form page is up as soon as Flask is. What happens next
+# depends on BILL_STARTUP:
+#
+#   "warm" (default)  a background thread imports ReportLab and renders one
+#                     throwaway bill, so fonts, the logo and the Terms pages are
+#                     ready before the first real bill
+#   "lazy"            nothing more; the first bill pays for the imports
+#
+# Each phase is timed and appended to the startup log next to the lines
+# run_bill_app.bat writes there.
+# ---------------------------------------------------------------------------------------------------
+
+STARTUP_MODES = ("warm", "lazy")
+
+# app.py imports this module first, so times are counted from here
+IMPORTED_AT = time.perf_counter()
+
+# what the throwaway render draws (form field names, as in booking.FIELDS);
+# non-zero amounts so the payment lines are laid out as on a real bill
+WARMUP_BOOKING = {
+    "name": "Warm-up", "pax": "1", "mobile": "0000000000", "event_type": "Warm-up",
+    "checkin": "2000-01-01T10:00", "checkout": "2000-01-02T10:00",
+    "function_rent": "1", "cleaning_charges": "1", "security_charges": "1", "electricity_charges": "1",
+}
+
+
+class StartupLog:
+    def __init__(self, path, mode):
+        self.path = path
+        self.mode = mode
+        self.started = IMPORTED_AT
+        self.phases = []        # (name, seconds), in the order they finished
+        self._lock = threading.Lock()
+        self.note(f"Bill app starting (pid {os.getpid()}, {mode} mode)")
+
+    def note(self, text):
+        if not self.path:
+            return
+        line = f"{datetime.now():%d-%m-%Y %H:%M:%S} {text}\n"
+        try:
+            with self._lock, open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+        except OSError:
+            pass    # a missing or read-only log must not stop the app
+
+    def record(self, name, seconds):
+        self.phases.append((name, seconds))
+        self.note(f"  {name}: {seconds * 1000:.0f} ms")
+
+    @contextmanager
+    def phase(self, name):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - t0)
+
+    def ready(self, what):
+        """Log the time from StartupLog() to now under `what`."""
+        self.record(what, time.perf_counter() - self.started)
+
+
+def warm_up(log):
+    """Import both bill engines and render one bill, timing each step."""
+    with log.phase("import reportlab"):
+        import Generate_Bill
+        import fast_bill  # noqa: F401
+    with log.phase("bill resources"):
+        Generate_Bill.get_resources()
+        Generate_Bill.warm_page2_cache()
+    # muted: not a bill, so it stays out of the metrics and renders_completed
+    with log.phase("throwaway render"), metrics.muted():
+        Generate_Bill.generate_bill(WARMUP_BOOKING)
+    log.ready("first bill ready")
+
+
+class WarmUp:
+    def __init__(self, log):
+        self.log = log
+        self.error = None
+        self._thread = threading.Thread(target=self._run, name="bill-warm-up", daemon=True)
+
+    def _run(self):
+        try:
+            warm_up(self.log)
+        except Exception as e:
+            # the first real render will hit the same problem and report it
+            self.error = e
+            self.log.note(f"  warm-up failed: {e!r}")
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def wait(self, timeout=None):
+        self._thread.join(timeout)
+        return not self._thread.is_alive()
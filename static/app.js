@@ -0,0 +1,277 @@
+const el = id => document.getElementById(id);
+
+const roomFieldIds = [
+  "double_rooms","double_extra","double_ac","double_rent",
+  "triple_rooms","triple_extra_bed","triple_ac","triple_rent_per_room"
+];
+
+function toggleRoomFields() {
+  const enabled = el("room_needed").checked;
+  roomFieldIds.forEach(id => {
+    const node = el(id);
+    node.disabled = !enabled;
+    if (!enabled) node.value = "";
+  });
+  updateTotals();
+}
+
+function parseNum(v) {
+  const n = parseFloat(v);
+  return isNaN(n) ? 0 : n;
+}
+
+// Totals come from the server's pricing engine (POST /api/quote), the same
+// code that prices the PDF. Only the latest request's answer is shown.
+let quoteSeq = 0;
+let quoteTimer = null;
+
+async function fetchQuote() {
+  const seq = ++quoteSeq;
+  const ci = el("checkin").value;
+  const co = el("checkout").value;
+  if (!ci || !co || co <= ci) {
+    el("total_rent").value = "";
+    el("balance").value = "";
+    return;
+  }
+
+  try {
+    const resp = await fetch("/api/quote", {
+      method: "POST",
+      body: new URLSearchParams(new FormData(el("billForm")))
+    });
+    if (seq !== quoteSeq) return;
+    if (!resp.ok) {
+      el("total_rent").value = "";
+      el("balance").value = "";
+      return;
+    }
+    const q = await resp.json();
+    if (seq !== quoteSeq) return;
+    el("total_rent").value = q.total_rent;
+    el("balance").value = q.balance;
+  } catch (e) {
+    // keep the last totals; the bill is priced on the server regardless
+  }
+}
+
+function updateTotals() {
+  const advance = parseNum(el("advance").value);
+  el("advance_mode").disabled = advance <= 0;
+  if (advance <= 0) el("advance_mode").value = "";
+
+  clearTimeout(quoteTimer);
+  quoteTimer = setTimeout(fetchQuote, 150);
+}
+
+// A fresh key per filled-in form: a double click sends the same key twice
+// and the server renders the bill once for both.
+function newIdempotencyKey() {
+  el("idempotency_key").value = Date.now().toString(36) + Math.random().toString(36).slice(2);
+}
+
+// ---------------- Past customers ----------------
+// Typing a name or mobile number lists earlier customers; picking one fills
+// the form from their last booking (everything except the dates and payment).
+let lookupSeq = 0;
+let lookupTimer = null;
+
+function hideSuggestions() {
+  el("customerSuggestions").style.display = "none";
+}
+
+function fillForm(values) {
+  const form = el("billForm");
+  el("room_needed").checked = values.room_needed === "on";
+  toggleRoomFields();
+  Object.entries(values).forEach(([field, value]) => {
+    const input = form.elements[field];
+    if (input && input.type !== "checkbox" && input.type !== "hidden" && value != null) input.value = value;
+  });
+  updateTotals();
+}
+
+function fillFromCustomer(c) {
+  fillForm(c.prefill);
+  hideSuggestions();
+}
+
+async function lookupCustomers(q) {
+  const seq = ++lookupSeq;
+  if (q.trim().length < 2) {
+    hideSuggestions();
+    return;
+  }
+  try {
+    const resp = await fetch(`/customers?${new URLSearchParams({ q })}`);
+    if (!resp.ok || seq !== lookupSeq) return;
+    const { customers } = await resp.json();
+    if (seq !== lookupSeq) return;
+
+    const box = el("customerSuggestions");
+    box.replaceChildren(...customers.map(c => {
+      const item = document.createElement("div");
+      item.className = "customer-suggestion";
+      item.textContent = `${c.name} - ${c.mobile} (${c.bookings} booking${c.bookings === 1 ? "" : "s"})`;
+      // mousedown, so the pick lands before the input's blur hides the list
+      item.addEventListener("mousedown", ev => {
+        ev.preventDefault();
+        fillFromCustomer(c);
+      });
+      return item;
+    }));
+    box.style.display = customers.length ? "block" : "none";
+  } catch (e) {
+    // no suggestions is fine; the form still works
+  }
+}
+
+// ---------------- Corrections ----------------
+// Opening the form as /?booking=<id> loads that booking; submitting it then
+// replaces the booking (and its bill) instead of adding a second one.
+async function loadCorrection() {
+  const id = new URLSearchParams(location.search).get("booking");
+  if (!id) return;
+  try {
+    const resp = await fetch(`/bookings/${encodeURIComponent(id)}`);
+    if (!resp.ok) return;
+    const b = await resp.json();
+    if (b.voided_at) {
+      alert(`Booking ${b.id} was already ${b.replaced_by ? "replaced by booking " + b.replaced_by : "cancelled"}.`);
+      return;
+    }
+    fillForm(b.data);
+    el("booking_id").value = b.id;
+    el("correctionNote").textContent = `Correcting booking ${b.id} (Bill No ${b.bill_no}). Generating replaces it.`;
+    el("correctionNote").style.display = "block";
+    checkAvailability();
+  } catch (e) {
+    // the form still works for a new booking
+  }
+}
+
+function endCorrection() {
+  el("booking_id").value = "";
+  el("correctionNote").style.display = "none";
+  history.replaceState(null, "", location.pathname);
+}
+
+// ---------------- Hall availability ----------------
+let hallClashes = [];
+
+function describeStay(s) {
+  const kind = s.confirmed ? "Booked" : "Quotation";
+  return `${kind}: ${s.name || "-"} (${s.event_type || "-"}) ${s.checkin.replace("T", " ")} to ${s.checkout.replace("T", " ")}`;
+}
+
+async function checkAvailability() {
+  const ci = el("checkin").value;
+  const co = el("checkout").value;
+  const box = el("availabilityWarning");
+  hallClashes = [];
+  box.style.display = "none";
+  if (!ci || !co || co <= ci) return;
+
+  try {
+    const params = new URLSearchParams({ checkin: ci, checkout: co });
+    // the booking being corrected does not clash with itself
+    if (el("booking_id").value) params.set("exclude", el("booking_id").value);
+    const resp = await fetch(`/availability?${params}`);
+    if (!resp.ok) return;
+    const result = await resp.json();
+    // the dates may have changed while waiting
+    if (el("checkin").value !== ci || el("checkout").value !== co) return;
+
+    hallClashes = result.conflicts.filter(s => s.confirmed);
+    if (result.conflicts.length) {
+      box.textContent = "Overlaps with: " + result.conflicts.map(describeStay).join("; ");
+      box.style.display = "block";
+    }
+  } catch (e) {
+    // the server still checks on submit
+  }
+}
+
+function validateForm() {
+
+  // ROOM VALIDATION
+  if (el("room_needed").checked) {
+    const doubleRooms = parseNum(el("double_rooms").value);
+    const doubleRent = parseNum(el("double_rent").value);
+
+    const tripleRooms = parseNum(el("triple_rooms").value);
+    const tripleRent = parseNum(el("triple_rent_per_room").value);
+
+    const doubleValid = doubleRooms > 0 && doubleRent > 0;
+    const tripleValid = tripleRooms > 0 && tripleRent > 0;
+
+    if (!doubleValid && !tripleValid) {
+      alert("Fill at least one valid room type (Double OR Triple).");
+      el("double_rooms").classList.add("validation-error");
+      el("double_rent").classList.add("validation-error");
+      el("triple_rooms").classList.add("validation-error");
+      el("triple_rent_per_room").classList.add("validation-error");
+      return false;
+    }
+  }
+
+  // ADVANCE VALIDATION
+  const advance = parseNum(el("advance").value);
+  const mode = el("advance_mode").value;
+
+  if (advance > 0 && (!mode || mode.trim() === "")) {
+    alert("Select Advance Payment Mode when Advance > 0.");
+    el("advance_mode").classList.add("validation-error");
+    return false;
+  }
+
+  // AVAILABILITY
+  el("allow_overlap").value = "";
+  if (hallClashes.length) {
+    if (!confirm("The hall is already booked for part of this stay. Generate the bill anyway?")) {
+      return false;
+    }
+    el("allow_overlap").value = "1";
+  }
+
+  return true;
+}
+
+document.getElementById("billForm").addEventListener("submit", function (ev) {
+  if (!validateForm()) {
+    ev.preventDefault();
+    return false;
+  }
+
+  setTimeout(() => {
+    document.getElementById("billForm").reset();
+    endCorrection();
+    toggleRoomFields();
+    updateTotals();
+    checkAvailability();
+    newIdempotencyKey();
+  }, 500);
+});
+
+document.addEventListener("DOMContentLoaded", () => {
+  [
+    "checkin","checkout","function_rent","cleaning_charges",
+    "security_charges","electricity_charges","advance",
+    "double_rooms","double_rent","triple_rooms","triple_rent_per_room"
+  ].forEach(id => el(id)?.addEventListener("input", updateTotals));
+
+  el("room_needed").addEventListener("change", toggleRoomFields);
+  newIdempotencyKey();
+  loadCorrection();
+
+  ["checkin","checkout"].forEach(id => el(id).addEventListener("change", checkAvailability));
+
+  ["name","mobile"].forEach(id => {
+    el(id).addEventListener("input", ev => {
+      clearTimeout(lookupTimer);
+      lookupTimer = setTimeout(() => lookupCustomers(ev.target.value), 120);
+    });
+    el(id).addEventListener("blur", hideSuggestions);
+    el(id).addEventListener("keydown", ev => { if (ev.key === "Escape") hideSuggestions(); });
+  });
+});
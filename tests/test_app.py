@@ -0,0 +1,76 @@
+"""
+The app end to end through Flask's test client, against a throwaway booking
+database, bill archive and login.
+"""
+import importlib
+import os
+from io import BytesIO
+
+import pytest
+from pypdf import PdfReader
+
+import bench
+from Generate_Bill import BILL_NO_FORMAT
+
+
+@pytest.fixture(scope="module")
+def app_module(tmp_path_factory):
+    tmp = tmp_path_factory.mktemp("app")
+    os.environ.update(
+        BILL_STARTUP="lazy",
+        STARTUP_LOG=str(tmp / "startup_log.txt"),
+        BOOKING_DB=str(tmp / "bookings.db"),
+        BILL_ARCHIVE_DIR=str(tmp / "archive"),
+        ASSET_BUILD_DIR=str(tmp / "assets"),
+        AUTH_FILE=str(tmp / "credentials.txt"),
+        SESSION_SECRET_FILE=str(tmp / "session_secret"),
+    )
+    return importlib.import_module("app")
+
+
+@pytest.fixture
+def client(app_module):
+    client = app_module.app.test_client()
+    response = client.post("/login", data={
+        "username": app_module.DEFAULT_USER, "password": app_module.DEFAULT_PASSWORD,
+    })
+    assert response.status_code == 302
+    return client
+
+
+def first_page_text(pdf):
+    return PdfReader(BytesIO(pdf)).pages[0].extract_text()
+
+
+def test_resubmitting_a_cancelled_booking_issues_a_new_bill(client):
+    first = client.post("/generate", data=bench.BASE_BOOKING)
+    assert first.status_code == 200
+    cancelled = client.post(f"/bookings/{first.headers['X-Booking-Id']}/cancel")
+    assert cancelled.status_code == 200
+
+    second = client.post("/generate", data=bench.BASE_BOOKING)
+    assert second.status_code == 200
+    bill_no = int(second.headers["X-Bill-No"])
+    assert bill_no == int(first.headers["X-Bill-No"]) + 1
+    assert second.get_etag() != first.get_etag()
+    assert BILL_NO_FORMAT.format(bill_no) in first_page_text(second.data)
+    assert client.get(f"/bills/{bill_no}").data == second.data
+
+
+@pytest.mark.parametrize("checkin, checkout", [
+    ("soon", "2025-01-02T10:00"),
+    ("2025-01-01T10:00", "2025-13-02T10:00"),
+    ("2025-01-02T10:00", "2025-01-01T10:00"),
+])
+def test_availability_rejects_unusable_stays(client, checkin, checkout):
+    response = client.get("/availability", query_string={"checkin": checkin, "checkout": checkout})
+    assert response.status_code == 400
+    assert "free" not in response.get_json()
+
+
+def test_default_login_is_announced(app_module):
+    with open(app_module.STARTUP_LOG, encoding="utf-8") as f:
+        assert f"Created {app_module.AUTH_FILE} with the default login" in f.read()
+    page = app_module.app.test_client().get("/login").get_data(as_text=True)
+    assert "login-warning" in page
+    assert app_module.DEFAULT_PASSWORD not in page
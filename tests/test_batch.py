@@ -0,0 +1,28 @@
+"""
+Batch bills come from a pool of spawned worker processes. A pool whose workers
+died must be replaced, not reused for every later batch.
+"""
+import io
+import zipfile
+
+import batch
+import bench
+from booking import Booking
+
+
+def zip_names(bookings):
+    return zipfile.ZipFile(io.BytesIO(b"".join(batch.stream_zip(bookings)))).namelist()
+
+
+def test_a_broken_pool_is_replaced():
+    bookings = [Booking.from_form(bench.BASE_BOOKING) for _ in range(2)]
+    assert zip_names(bookings) == ["001_Ravi_Kumar.pdf", "002_Ravi_Kumar.pdf"]
+
+    pool = batch.get_pool()
+    for process in list(pool._processes.values()):
+        process.kill()
+        process.join()
+    zip_names(bookings)     # may still go to the dead pool
+
+    assert batch.get_pool() is not pool
+    assert zip_names(bookings) == ["001_Ravi_Kumar.pdf", "002_Ravi_Kumar.pdf"]
@@ -0,0 +1,57 @@
+"""
+The canvas engine (fast_bill.py) must lay bills out exactly as platypus does:
+same text, same positions, on both pages. Content it cannot draw itself has to
+fall back to platypus rather than render differently.
+"""
+from io import BytesIO
+
+import pytest
+from pypdf import PdfReader
+
+import bench
+from booking import Booking
+from fast_bill import render_canvas
+from Generate_Bill import bill_content, generate_bill, get_resources
+
+BOOKINGS = {
+    "plain": bench.BASE_BOOKING,
+    "rooms": dict(bench.BASE_BOOKING, **bench.ROOMS),
+    "short_remarks": dict(bench.BASE_BOOKING, remarks=bench.SHORT_REMARKS),
+    "long_remarks": dict(bench.BASE_BOOKING, **bench.ROOMS, remarks=bench.LONG_REMARKS),
+    "advance": dict(bench.BASE_BOOKING, advance="10000", advance_mode="UPI"),
+    "newline_in_cell": dict(bench.BASE_BOOKING, name="Ravi\nKumar", event_type="Wedding\nReception"),
+    "long_word_remarks": dict(bench.BASE_BOOKING, remarks="Decor:" + "x" * 200 + " done"),
+    "markup_remarks": dict(bench.BASE_BOOKING, remarks="Stage <b>and</b> lights & sound"),
+}
+
+
+def text_runs(pdf):
+    """[(x, y, text)] for every piece of text drawn, page by page."""
+    pages = []
+    for page in PdfReader(BytesIO(pdf)).pages:
+        runs = []
+
+        def visit(text, cm, tm, font, size):
+            if text.strip():
+                x = tm[4] * cm[0] + tm[5] * cm[2] + cm[4]
+                y = tm[4] * cm[1] + tm[5] * cm[3] + cm[5]
+                runs.append((round(x, 1), round(y, 1), text.strip()))
+
+        page.extract_text(visitor_text=visit)
+        pages.append(sorted(runs))
+    return pages
+
+
+@pytest.mark.parametrize("case", sorted(BOOKINGS))
+def test_canvas_matches_platypus(case):
+    booking = BOOKINGS[case]
+    platypus = text_runs(generate_bill(booking, engine="platypus").getvalue())
+    canvas = text_runs(generate_bill(booking, engine="canvas").getvalue())
+    assert canvas == platypus
+
+
+@pytest.mark.parametrize("case", ["newline_in_cell", "long_word_remarks", "markup_remarks"])
+def test_canvas_declines_what_it_cannot_draw(case):
+    content = bill_content(Booking.from_form(BOOKINGS[case]))
+    content["compact"] = False
+    assert render_canvas(content, BytesIO(), get_resources()) is False
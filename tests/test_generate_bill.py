@@ -0,0 +1,24 @@
+"""
+Every bill carries the hall's logo, whichever engine draws it and in both
+the full and the compact layout.
+"""
+from io import BytesIO
+
+import pytest
+from pypdf import PdfReader
+
+import bench
+from Generate_Bill import BILL_ENGINES, generate_bill
+
+
+def images_on_first_page(pdf):
+    page = PdfReader(BytesIO(pdf)).pages[0]
+    xobjects = page["/Resources"].get("/XObject", {})
+    return [x for x in (ref.get_object() for ref in xobjects.values()) if x["/Subtype"] == "/Image"]
+
+
+@pytest.mark.parametrize("compact", [False, True])
+@pytest.mark.parametrize("engine", BILL_ENGINES)
+def test_bill_has_logo(engine, compact):
+    pdf = generate_bill(bench.BASE_BOOKING, engine=engine, compact=compact).getvalue()
+    assert len(images_on_first_page(pdf)) == 1